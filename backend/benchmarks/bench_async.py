@@ -0,0 +1,110 @@
+"""
+Compares the sync gunicorn workers with the ASGI mode (uvicorn serving asgi.py) at high concurrency.
+
+Both servers run 4 worker processes against a temporary database. Two scenarios are measured:
+  mix          the load test's request mix at the given concurrency
+  slow-clients the same number of readers of small endpoints while --slow-clients connections
+               download a large paste at a throttled rate, like clients on a slow network
+
+With sync workers every slow download holds a whole worker process; in ASGI mode it only holds
+a socket on the event loop.
+
+Usage:
+    python benchmarks/bench_async.py [--concurrency 64] [--duration 10] [--slow-clients 8]
+"""
+import argparse
+import json
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+from loadtest import Client, free_port, run_level, seed, start_server
+
+# Large enough that the socket buffers cannot absorb it, so the server has to wait for the reader
+LARGE_PASTE_BYTES = 32 * 1024 * 1024
+
+READ_MIX = {
+    'GET /database/': (Client.inventory_list, 1),
+    'GET /healthcheck': (Client.healthcheck, 1),
+}
+
+
+def create_large_paste(port):
+    line = b''.join(f'{i:08d} '.encode() for i in range(100)) + b'\n'
+    body = line * (LARGE_PASTE_BYTES // len(line))
+    client = Client(port, None, [])
+    client.connection.request('PUT', '/pastebin', body=body, headers={'Content-Type': 'text/plain'})
+    response = client.connection.getresponse()
+    data = response.read()
+    if response.status != 201:
+        raise SystemExit(f"Creating the large paste failed: {response.status} {data[:200]!r}")
+    return json.loads(data)['id']
+
+
+def slow_download(port, paste_id, stop, rate):
+    """Downloads the paste at about rate bytes per second until it is complete or stop is set."""
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16 * 1024)
+    sock.connect(('127.0.0.1', port))
+    sock.sendall(f'GET /pastebin/{paste_id} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode())
+    chunk = 16 * 1024
+    try:
+        while not stop.is_set() and sock.recv(chunk):
+            time.sleep(chunk / rate)
+    finally:
+        sock.close()
+
+
+def run_slow_clients(port, args, paste_ids, paste_id):
+    stop = threading.Event()
+    downloads = [
+        threading.Thread(target=slow_download, args=(port, paste_id, stop, args.slow_rate))
+        for _ in range(args.slow_clients)
+    ]
+    for download in downloads:
+        download.start()
+    time.sleep(1)  # Let the downloads occupy the server before measuring
+    try:
+        result = run_level(port, args.concurrency, args.duration, paste_ids, mix=READ_MIX)
+    finally:
+        stop.set()
+        for download in downloads:
+            download.join()
+    return result
+
+
+def print_row(server, scenario, total):
+    print(f"{server:<6} {scenario:<13} {total['requests']:>9} {total['errors']:>7} {total['rps']:>9.1f} "
+          f"{total['p50_ms'] or 0:>9.2f} {total['p95_ms'] or 0:>9.2f} {total['p99_ms'] or 0:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=64, help='concurrent clients (default: 64)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--slow-clients', type=int, default=8, help='throttled large paste downloads (default: 8)')
+    parser.add_argument('--slow-rate', type=int, default=256 * 1024, help='bytes per second per slow client')
+    args = parser.parse_args()
+
+    print(f"concurrency {args.concurrency}, {args.duration:.0f}s per scenario, {args.slow_clients} slow clients")
+    print(f"{'server':<6} {'scenario':<13} {'requests':>9} {'errors':>7} {'req/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for server_name in ('sync', 'asgi'):
+        port = free_port()
+        with tempfile.TemporaryDirectory() as tmp:
+            # Server errors are expected here (sync workers time out on slow clients)
+            server = start_server(tmp, port, server_name, stderr=subprocess.DEVNULL)
+            try:
+                paste_ids = seed(port)
+                paste_id = create_large_paste(port)
+                print_row(server_name, 'mix', run_level(port, args.concurrency, args.duration, paste_ids)['total'])
+                print_row(server_name, 'slow-clients', run_slow_clients(port, args, paste_ids, paste_id)['total'])
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
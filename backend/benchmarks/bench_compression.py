@@ -0,0 +1,111 @@
+"""
+CPU cost of response compression (compression.py) against the bytes it saves, per zlib level.
+
+Real responses of the app are captured once without Accept-Encoding (an inventory page, a large
+page, the streamed inventory, the OpenAPI document, /metrics and a log-like text paste) and then
+replayed through CompressionMiddleware with gzip accepted. 'break-even Mbit/s' is the link speed
+at which sending the saved bytes would take as long as compressing them: on slower links the
+compressed response arrives sooner, even before counting the cheaper egress.
+
+Usage:
+    python benchmarks/bench_compression.py [--items 10000] [--levels 1,6,9]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+
+def capture(client, path):
+    """Returns (status, headers, chunks) of an uncompressed response, keeping a stream's chunks."""
+    response = client.get(path, buffered=False)
+    chunks = [chunk for chunk in response.response if chunk]
+    response.close()
+    return response.status, list(response.headers.items()), chunks
+
+
+def replay(middleware, status, headers, chunks):
+    """Serves a captured response through middleware; returns the number of bytes sent."""
+    def wsgi_app(environ, start_response):
+        start_response(status, headers)
+        return iter(chunks)
+
+    middleware.wsgi_app = wsgi_app
+    environ = {'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': 'gzip'}
+    return sum(len(chunk) for chunk in middleware(environ, lambda status, headers, exc_info=None: None))
+
+
+def cpu_seconds_per_response(middleware, response, min_seconds=0.2):
+    runs = 0
+    started = time.process_time()
+    while True:
+        replay(middleware, *response)
+        runs += 1
+        elapsed = time.process_time() - started
+        if elapsed >= min_seconds:
+            return elapsed / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000, help='inventory items to seed (default: 10000)')
+    parser.add_argument('--levels', default='1,6,9', help='comma-separated zlib levels (default: 1,6,9)')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            DATABASE_PATH=os.path.join(tmp, 'compression.db'),
+            PASTE_CACHE_DIR=os.path.join(tmp, 'paste_cache'),
+            METRICS_DIR=os.path.join(tmp, 'metrics'),
+            PASTE_SWEEPER_AUTOSTART='false',
+            COMPRESSION_ENABLED='false',
+            LOG_LEVEL='WARNING',
+        )
+        from sqlalchemy import insert
+        from app import app
+        from compression import CompressionMiddleware
+        from database import db, Inventory
+
+        with app.app_context():
+            db.session.execute(insert(Inventory), [
+                {'name': f'Item {i:06d} ({["small", "medium", "large"][i % 3]})', 'quantity': i % 250,
+                 'price': round(0.99 + (i * 7919 % 100000) / 100, 2)}
+                for i in range(args.items)
+            ])
+            db.session.commit()
+
+        client = app.test_client()
+        log_lines = ''.join(
+            f'2026-10-17T12:{i // 60 % 60:02d}:{i % 60:02d}Z INFO worker-{i % 4} GET /database/?page={i % 50} 200 {i % 97} ms\n'
+            for i in range(2000)
+        )
+        paste_id = client.post('/pastebin', json={'text': log_lines}).get_json()['id']
+        responses = [
+            ('inventory page (100)', capture(client, '/database/?limit=100')),
+            ('inventory page (1000)', capture(client, '/database/?limit=1000')),
+            (f'inventory stream ({args.items})', capture(client, '/database/?stream=1')),
+            ('swagger.json', capture(client, '/swagger.json')),
+            ('metrics', capture(client, '/metrics')),
+            ('text paste', capture(client, f'/pastebin/{paste_id}')),
+        ]
+
+        print(f"{'response':<26} {'bytes':>9} {'level':>5} {'gzip bytes':>10} {'saved':>6} "
+              f"{'CPU us':>9} {'MB/s':>7} {'break-even Mbit/s':>18}")
+        for name, response in responses:
+            size = sum(len(chunk) for chunk in response[2])
+            for level in levels:
+                middleware = CompressionMiddleware(None, level=level, min_bytes=0)
+                sent = replay(middleware, *response)
+                seconds = cpu_seconds_per_response(middleware, response)
+                saved = size - sent
+                print(f"{name:<26} {size:>9} {level:>5} {sent:>10} {saved / size:>6.1%} {seconds * 1e6:>9.0f} "
+                      f"{size / seconds / 1e6:>7.1f} {saved * 8 / seconds / 1e6:>18.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-call cost of the logging configurations in logging_config.py, as seen by a request thread.
+
+Each scenario logs the same INFO message with a small payload. The console stream discards
+the output after an optional delay that models a slow stdout (a full pipe to a log collector).
+The 'filtered' scenarios show what a call costs when its level is disabled: an f-string is
+always built, a %-style call is not.
+
+Usage:
+    python benchmarks/bench_logging.py [--calls 20000] [--write-latency-us 50]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import logging_config
+from logging_config import configure_logging
+
+PAYLOAD = {'id': 42, 'name': 'widget', 'quantity': 7, 'price': 9.99, 'tags': list(range(20))}
+
+
+class SlowStream:
+    """Discards writes after sleeping for latency seconds."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def write(self, _):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def flush(self):
+        pass
+
+
+def use_stream(stream):
+    """Points the console handler (which may be behind the queue listener) at stream."""
+    handlers = list(logging.getLogger().handlers)
+    if logging_config._listener is not None:
+        handlers.extend(logging_config._listener.handlers)
+    for handler in handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(stream)
+
+
+def lazy_call(logger):
+    logger.info("Item added to database: %s", PAYLOAD)
+
+
+def fstring_call(logger):
+    logger.info(f"Item added to database: {PAYLOAD}")
+
+
+SCENARIOS = [
+    # name, configure_logging kwargs, log call
+    ('sync', {'fmt': 'plain'}, lazy_call),
+    ('sync json', {'fmt': 'json'}, lazy_call),
+    ('queue', {'fmt': 'plain', 'use_queue': True}, lazy_call),
+    ('queue json', {'fmt': 'json', 'use_queue': True}, lazy_call),
+    ('queue 10% sampled', {'fmt': 'plain', 'use_queue': True, 'sample_rates': {'bench': 0.1}}, lazy_call),
+    ('filtered f-string', {'fmt': 'plain', 'level': 'WARNING'}, fstring_call),
+    ('filtered lazy', {'fmt': 'plain', 'level': 'WARNING'}, lazy_call),
+]
+
+
+def run_scenario(name, options, call, args):
+    configure_logging(**options)
+    use_stream(SlowStream(args.write_latency_us / 1e6))
+    logger = logging.getLogger('bench')
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        call(logger)
+    elapsed = time.perf_counter() - start
+    # Drain the queue so the next scenario starts clean; not part of the measured time
+    if logging_config._listener is not None:
+        configure_logging(fmt='plain', level='WARNING')
+    print(f"{name:<20} {elapsed / args.calls * 1e6:>12.2f} {args.calls / elapsed:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000, help='log calls per scenario')
+    parser.add_argument('--write-latency-us', type=float, default=50.0,
+                        help='simulated delay of each console write, in microseconds (default: 50)')
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls per scenario, {args.write_latency_us:.0f}us per console write")
+    print(f"{'scenario':<20} {'us/call':>12} {'calls/s':>14}")
+    for name, options, call in SCENARIOS:
+        run_scenario(name, options, call, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Mixed read/write throughput benchmark for the SQLite connection settings.
+
+Runs several worker processes against a temporary database, the way gunicorn workers share
+instance/database.db, once with a bare engine and once with the pragmas applied by init_db.
+
+Usage:
+    python benchmarks/bench_sqlite_pragmas.py [--workers 4] [--duration 5] [--write-ratio 0.2]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from database import register_sqlite_pragmas
+
+PROFILES = {
+    # SQLite defaults: rollback journal, synchronous=FULL, pysqlite's 5 second busy timeout
+    'default': {},
+    # The defaults applied by app.py
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16000,
+    },
+}
+
+SEED_ROWS = 10000
+
+
+def make_engine(db_path, pragmas):
+    engine = create_engine(f'sqlite:///{db_path}')
+    register_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def seed(db_path, pragmas):
+    engine = make_engine(db_path, pragmas)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE inventory (id INTEGER PRIMARY KEY, name VARCHAR(80) NOT NULL, "
+            "quantity INTEGER NOT NULL, price FLOAT NOT NULL)"
+        ))
+        conn.execute(
+            text("INSERT INTO inventory (name, quantity, price) VALUES (:name, :quantity, :price)"),
+            [{'name': f'item-{i}', 'quantity': i % 100, 'price': i / 10} for i in range(SEED_ROWS)]
+        )
+    engine.dispose()
+
+
+def worker(db_path, pragmas, duration, write_ratio, seed_value, results):
+    """Issues a random mix of point reads and single-row write transactions until the deadline."""
+    rng = random.Random(seed_value)
+    engine = make_engine(db_path, pragmas)
+    reads = writes = errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        item_id = rng.randint(1, SEED_ROWS)
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    conn.execute(text("UPDATE inventory SET quantity = quantity + 1 WHERE id = :id"), {'id': item_id})
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT id, name, quantity, price FROM inventory WHERE id = :id"), {'id': item_id}).fetchall()
+                reads += 1
+        except OperationalError:
+            # 'database is locked' after the busy timeout expired
+            errors += 1
+    engine.dispose()
+    results.put((reads, writes, errors))
+
+
+def run_profile(name, pragmas, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        seed(db_path, pragmas)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(db_path, pragmas, args.duration, args.write_ratio, i, results))
+            for i in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [0, 0, 0]
+        for _ in processes:
+            for index, value in enumerate(results.get()):
+                totals[index] += value
+        for process in processes:
+            process.join()
+    reads, writes, errors = totals
+    print(f"{name:<8} {reads / args.duration:>12.0f} {writes / args.duration:>12.0f} "
+          f"{(reads + writes) / args.duration:>12.0f} {errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='concurrent processes (default: 4, like the Dockerfile)')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per profile')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='fraction of operations that write')
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.duration:.0f}s per profile, {args.write_ratio:.0%} writes")
+    print(f"{'profile':<8} {'reads/s':>12} {'writes/s':>12} {'total/s':>12} {'locked':>8}")
+    for name, pragmas in PROFILES.items():
+        run_profile(name, pragmas, args)
+
+
+if __name__ == '__main__':
+    main()
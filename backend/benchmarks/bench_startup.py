@@ -0,0 +1,90 @@
+"""
+Time-to-first-request of a fresh Python process, as a worker experiences it on scale-out or --reload.
+
+Each sample starts a new interpreter that imports app.py and serves GET /healthcheck through the
+test client, and reports the time spent importing the app and until the first response. Measured
+against a new database (the schema is created and stamped), against an already stamped one (no DDL
+or schema introspection), with and without the Swagger UI, and against one whose stamp was removed,
+so that every start migrates it. The migration recounts the rows and rebuilds the search index, so
+its cost grows with --items. Startup time is noisy on a busy machine; the minimum of the samples is
+the number to compare.
+
+Usage:
+    python benchmarks/bench_startup.py [--samples 7] [--items 0]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+status = app.app.test_client().get('/healthcheck').status_code
+assert status == 200, status
+print(json.dumps({'import_ms': (imported - started) * 1000, 'first_request_ms': (time.perf_counter() - started) * 1000}))
+"""
+
+SCENARIOS = [
+    # name, database ('new' for every sample, 'stamped' or 'unstamped' shared one), extra environment
+    ('new database', 'new', {}),
+    ('stamped database', 'stamped', {}),
+    ('stamped, no Swagger UI', 'stamped', {'SWAGGER_UI_ENABLED': 'false'}),
+    ('unstamped database', 'unstamped', {}),
+]
+
+
+def seed(database, items):
+    with sqlite3.connect(database) as connection:
+        connection.executemany(
+            "INSERT INTO inventory (name, quantity, price) VALUES (?, ?, ?)",
+            ((f'Item {i:06d} widget', i % 250, 0.99 + i % 1000) for i in range(items))
+        )
+
+
+def sample(tmp, kind, extra_env):
+    database = os.path.join(tmp, f'startup-{os.urandom(4).hex()}.db' if kind == 'new' else 'startup.db')
+    if kind == 'unstamped':
+        with sqlite3.connect(database) as connection:
+            connection.execute("DELETE FROM schema_version")
+    env = dict(
+        os.environ,
+        DATABASE_PATH=database,
+        PASTE_CACHE_DIR=os.path.join(tmp, 'paste_cache'),
+        METRICS_DIR=os.path.join(tmp, 'metrics'),
+        PASTE_SWEEP_INTERVAL_SECONDS='0',
+        LOG_LEVEL='WARNING',
+        **extra_env,
+    )
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=SRC_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=7, help='processes started per scenario (default: 7)')
+    parser.add_argument('--items', type=int, default=0, help='inventory items in the shared database (default: 0)')
+    args = parser.parse_args()
+
+    print(f"{'scenario':<24} {'import ms':>10} {'first request ms':>17} {'median ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        sample(tmp, 'stamped', {})  # Create and stamp the shared database, and warm the bytecode cache
+        seed(os.path.join(tmp, 'startup.db'), args.items)
+        for name, kind, extra_env in SCENARIOS:
+            samples = [sample(tmp, kind, extra_env) for _ in range(args.samples)]
+            first_request = [s['first_request_ms'] for s in samples]
+            print(f"{name:<24} {min(s['import_ms'] for s in samples):>10.1f} {min(first_request):>17.1f} "
+                  f"{statistics.median(first_request):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
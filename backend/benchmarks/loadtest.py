@@ -0,0 +1,379 @@
+"""
+HTTP load test of the backend running under gunicorn, with a baseline regression check.
+
+Starts gunicorn with the production settings from gunicorn.conf.py (or, with --server asgi,
+uvicorn serving asgi.py) against a temporary SQLite database, then drives a weighted mix of inventory CRUD, pastebin and health check requests at
+each concurrency level. Throughput and p50/p95/p99 latency are reported per route and saved as
+JSON. When a baseline file exists, a route whose p95 latency rose or whose throughput fell by
+more than the tolerance is reported as a regression and the exit status is 1. Results record the
+commit and the git tree of src/ they were measured at; comparing against a baseline of another
+tree, or against local changes, prints a warning, since the baseline then no longer describes the
+code it guards.
+
+Only the standard library is used for the load generator (threads and http.client).
+
+Usage:
+    python benchmarks/loadtest.py [--concurrency 1,8,32] [--duration 10] [--output results.json]
+    python benchmarks/loadtest.py --update-baseline
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadtest_baseline.json')
+
+# Worker processes for every server mode
+GUNICORN_WORKERS = 4
+
+SEED_ITEMS = 500
+SEED_PASTES = 100
+PASTE_TEXT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20
+
+
+class Client:
+    """One simulated user: a connection to the server plus the resources it created."""
+
+    def __init__(self, port, rng, paste_ids):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        self.rng = rng
+        self.paste_ids = paste_ids
+        self.created_items = []
+
+    def request(self, method, path, body=None):
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            # gunicorn's sync workers close the connection after every response
+            self.connection.close()
+            raise
+        if response.will_close:
+            self.connection.close()
+        return response.status, data
+
+    # --- Operations; each returns the HTTP status ---
+
+    def inventory_list(self):
+        return self.request('GET', f'/database/?limit=50&after_id={self.rng.randint(0, SEED_ITEMS)}')[0]
+
+    def inventory_create(self):
+        status, data = self.request('POST', '/database/', {
+            'name': f'load-{self.rng.randint(0, 10 ** 9)}', 'quantity': self.rng.randint(1, 100), 'price': 9.99
+        })
+        if status == 201:
+            self.created_items.append(json.loads(data)['id'])
+        return status
+
+    def inventory_update(self):
+        item_id = self.rng.randint(1, SEED_ITEMS)
+        return self.request('PUT', f'/database/{item_id}', {'quantity': self.rng.randint(1, 100)})[0]
+
+    def inventory_delete(self):
+        if not self.created_items:
+            return self.inventory_create()
+        return self.request('DELETE', f'/database/{self.created_items.pop()}')[0]
+
+    def paste_create(self):
+        # Half of the uploads repeat a seeded text, the rest are unique
+        suffix = self.rng.randint(0, SEED_PASTES - 1) if self.rng.random() < 0.5 else self.rng.random()
+        return self.request('POST', '/pastebin', {'text': f'{PASTE_TEXT}{suffix}'})[0]
+
+    def paste_read(self):
+        return self.request('GET', f'/pastebin/{self.rng.choice(self.paste_ids)}')[0]
+
+    def healthcheck(self):
+        return self.request('GET', '/healthcheck')[0]
+
+
+# Route name -> (operation, weight)
+MIX = {
+    'GET /database/': (Client.inventory_list, 30),
+    'POST /database/': (Client.inventory_create, 10),
+    'PUT /database/<id>': (Client.inventory_update, 10),
+    'DELETE /database/<id>': (Client.inventory_delete, 5),
+    'POST /pastebin': (Client.paste_create, 10),
+    'GET /pastebin/<id>': (Client.paste_read, 25),
+    'GET /healthcheck': (Client.healthcheck, 10),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# Server command lines; the app is started from backend/src
+SERVERS = {
+    # Production settings (gunicorn.conf.py), with the worker count pinned for comparable results
+    'sync': [sys.executable, '-m', 'gunicorn', '--bind', '127.0.0.1:{port}', '--workers', str(GUNICORN_WORKERS),
+             '--access-logfile', '-', '--log-level', 'warning', 'app:app'],
+    # The same number of workers serving asgi.py
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', '{port}',
+             '--workers', str(GUNICORN_WORKERS), '--log-level', 'warning'],
+}
+
+
+def start_server(tmp, port, server='sync', extra_env=None, stderr=None):
+    """Starts the app and waits until /healthcheck answers. Returns the server process."""
+    env = dict(
+        os.environ,
+        DATABASE_PATH=os.path.join(tmp, 'loadtest.db'),
+        PASTE_CACHE_DIR=os.path.join(tmp, 'paste_cache'),
+        METRICS_DIR=os.path.join(tmp, 'metrics'),
+        LOG_LEVEL='WARNING',
+        SLOW_REQUEST_MS='0',
+        **(extra_env or {}),
+    )
+    command = [part.format(port=port) for part in SERVERS[server]]
+    server = subprocess.Popen(command, cwd=os.path.join(BACKEND_DIR, 'src'), env=env, stdout=subprocess.DEVNULL,
+                              stderr=stderr)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"{command[2]} exited with status {server.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/healthcheck')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    sys.exit(f"{command[2]} did not become healthy within 30 seconds")
+
+
+def seed(port):
+    """Creates the inventory items and pastes the mix reads and updates. Returns the paste IDs."""
+    client = Client(port, random.Random(0), [])
+    for i in range(SEED_ITEMS):
+        client.request('POST', '/database/', {'name': f'seed-{i}', 'quantity': i % 100, 'price': 1.5})
+    paste_ids = []
+    for i in range(SEED_PASTES):
+        status, data = client.request('POST', '/pastebin', {'text': f'{PASTE_TEXT}{i}'})
+        paste_ids.append(json.loads(data)['id'])
+    return paste_ids
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_level(port, concurrency, duration, paste_ids, mix=MIX):
+    """Runs the mix with concurrency clients for duration seconds and returns per-route results."""
+    names = list(mix)
+    weights = [mix[name][1] for name in names]
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+    deadline = [0.0]
+
+    def user(index):
+        client = Client(port, random.Random(concurrency * 1000 + index), paste_ids)
+        local_samples = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        start_barrier.wait()
+        while time.perf_counter() < deadline[0]:
+            name = client.rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = mix[name][0](client)
+            except (OSError, http.client.HTTPException):
+                status = None
+            elapsed = time.perf_counter() - start
+            if status is None or status >= 500:
+                local_errors[name] += 1
+            else:
+                local_samples[name].append(elapsed)
+        with lock:
+            for name in names:
+                samples[name].extend(local_samples[name])
+                errors[name] += local_errors[name]
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    routes = {}
+    all_samples = []
+    for name in names:
+        values = sorted(samples[name])
+        all_samples.extend(values)
+        routes[name] = summarize(values, errors[name], duration)
+    all_samples.sort()
+    return {'routes': routes, 'total': summarize(all_samples, sum(errors.values()), duration)}
+
+
+def summarize(sorted_values, errors, duration):
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': len(sorted_values),
+        'errors': errors,
+        'rps': round(len(sorted_values) / duration, 1),
+        'p50_ms': ms(percentile(sorted_values, 0.50)),
+        'p95_ms': ms(percentile(sorted_values, 0.95)),
+        'p99_ms': ms(percentile(sorted_values, 0.99)),
+    }
+
+
+def print_level(concurrency, result):
+    print(f"\nconcurrency {concurrency}")
+    print(f"{'route':<24} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, route in list(result['routes'].items()) + [('total', result['total'])]:
+        print(f"{name:<24} {route['requests']:>9} {route['errors']:>7} {route['rps']:>9.1f} "
+              f"{route['p50_ms'] or 0:>9.2f} {route['p95_ms'] or 0:>9.2f} {route['p99_ms'] or 0:>9.2f}")
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regressions of results against baseline."""
+    regressions = []
+    for level, result in results['levels'].items():
+        base_level = baseline.get('levels', {}).get(level)
+        if base_level is None:
+            continue
+        for name, route in list(result['routes'].items()) + [('total', result['total'])]:
+            base = base_level['routes'].get(name) if name != 'total' else base_level['total']
+            if not base or not route['requests']:
+                continue
+            if base['p95_ms'] and route['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"concurrency {level}, {name}: p95 {route['p95_ms']:.2f} ms "
+                                   f"(baseline {base['p95_ms']:.2f} ms)")
+            if base['rps'] and route['rps'] < base['rps'] * (1 - tolerance):
+                regressions.append(f"concurrency {level}, {name}: {route['rps']:.1f} req/s "
+                                   f"(baseline {base['rps']:.1f} req/s)")
+            if route['errors'] > base['errors']:
+                regressions.append(f"concurrency {level}, {name}: {route['errors']} errors "
+                                   f"(baseline {base['errors']})")
+    return regressions
+
+
+def source_version():
+    """Returns the commit and the git tree of src/ (None outside a git checkout), and whether src/ has local changes."""
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'src_tree': git('rev-parse', 'HEAD:./src'),
+        'src_modified': bool(git('status', '--porcelain', '--', 'src')),
+    }
+
+
+def stale_baseline_warnings(results, baseline):
+    """Returns reasons why baseline may not describe the code that produced results."""
+    current, recorded = results['meta'], baseline.get('meta', {})
+    warnings = []
+    if recorded.get('src_tree') is None:
+        warnings.append("the baseline does not record the source tree it was measured at")
+    elif recorded['src_tree'] != current['src_tree'] or recorded.get('src_modified'):
+        warnings.append(f"the baseline was measured at commit {recorded.get('commit')}, "
+                        f"with different source code")
+    if current['src_modified']:
+        warnings.append("src/ has uncommitted changes")
+    for key in ('server', 'workers', 'cpus', 'duration_s'):
+        if recorded.get(key) != current[key]:
+            warnings.append(f"{key} differs (baseline {recorded.get(key)}, now {current[key]})")
+    return warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated concurrency levels (default: 1,8,32)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    parser.add_argument('--server', choices=list(SERVERS), default='sync',
+                        help='sync: gunicorn (as in the Dockerfile), asgi: uvicorn serving asgi.py')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative p95 increase / throughput decrease (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true', help='save the results as the new baseline')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(tmp, port, args.server)
+        try:
+            paste_ids = seed(port)
+            results = {
+                'meta': {
+                    'duration_s': args.duration,
+                    'server': args.server,
+                    'workers': GUNICORN_WORKERS,
+                    'python': platform.python_version(),
+                    'cpus': os.cpu_count(),
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                    **source_version(),
+                },
+                'levels': {},
+            }
+            for concurrency in levels:
+                result = run_level(port, concurrency, args.duration, paste_ids)
+                results['levels'][str(concurrency)] = result
+                print_level(concurrency, result)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    warnings = stale_baseline_warnings(results, baseline)
+    if warnings:
+        print(f"\nWARNING: {args.baseline} may be stale; record it again with --update-baseline:")
+        for warning in warnings:
+            print(f"  {warning}")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSIONS (tolerance {args.tolerance:.0%}):")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
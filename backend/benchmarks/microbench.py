@@ -0,0 +1,373 @@
+"""
+In-process microbenchmarks of the models and request handlers.
+
+Runs against a temporary database with seeded synthetic data, through app.test_client() where a
+handler is measured. Every benchmark is warmed up once and then timed for several rounds with the
+garbage collector disabled; the median is the number to compare. Results can be written as JSON
+and compared with the results of another commit.
+
+Usage:
+    python benchmarks/microbench.py [--sizes 10000,100000] [--rounds 7] [--filter to_dict]
+                                    [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+# The app reads its configuration when imported, so point it at a scratch directory first
+TMP_DIR = tempfile.mkdtemp(prefix='microbench-')
+os.environ.update({
+    'DATABASE_PATH': os.path.join(TMP_DIR, 'bench.db'),
+    'PASTE_CACHE_DIR': os.path.join(TMP_DIR, 'paste_cache'),
+    'METRICS_DIR': os.path.join(TMP_DIR, 'metrics'),
+    'PASTE_SWEEP_INTERVAL_SECONDS': '0',
+    'SLOW_REQUEST_MS': '0',
+    'LOG_LEVEL': 'ERROR',
+})
+
+from flask import Flask, jsonify
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import joinedload
+
+from app import app, paste_cache
+from database import db, init_db, Inventory, INVENTORY_COLUMNS, inventory_dicts, Pastebin, PasteBlob
+from json_provider import FastJSONProvider
+from pastes import store_paste
+import shared_stats
+
+SEED = 1234
+PASTE_BLOBS = 1000  # Distinct paste bodies; pastes share them like deduplicated uploads
+
+
+# --- Synthetic data ---
+
+def seed_inventory(count, rng):
+    db.session.execute(delete(Inventory))
+    db.session.execute(insert(Inventory), [
+        {'name': f'item-{i}-{rng.randrange(10 ** 6)}', 'quantity': rng.randrange(1000),
+         'price': round(rng.uniform(0.5, 500), 2)}
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def seed_pastes(count, rng):
+    db.session.execute(delete(Pastebin))
+    db.session.execute(delete(PasteBlob))
+    blobs = []
+    for i in range(PASTE_BLOBS):
+        text = ' '.join(f'word{rng.randrange(5000)}' for _ in range(rng.randrange(10, 200)))
+        data = text.encode('utf-8')
+        blobs.append({'digest': f'{i:064x}', 'codec': 'identity', 'data': data, 'size': len(data),
+                      'stored_size': len(data), 'refcount': 0})
+    now = datetime.utcnow()
+    pastes = []
+    for i in range(count):
+        blob = blobs[rng.randrange(PASTE_BLOBS)]
+        blob['refcount'] += 1
+        pastes.append({'id': f'{i:032x}', 'blob_digest': blob['digest'], 'content': '', 'created_at': now,
+                       'expires_at': now + timedelta(hours=24), 'content_type': 'text/plain'})
+    db.session.execute(insert(PasteBlob), [blob for blob in blobs if blob['refcount']])
+    db.session.execute(insert(Pastebin), pastes)
+    db.session.commit()
+
+
+def new_paste(text, expires_at):
+    paste_id = os.urandom(16).hex()
+    store_paste(paste_id, text, 'text/plain', expires_at)
+    db.session.commit()
+    return paste_id
+
+
+def check(response, status):
+    """Fails the benchmark instead of timing error responses."""
+    if response.status_code != status:
+        raise RuntimeError(f"Expected {status}, got {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+# --- Benchmarks ---
+# Each benchmark function prepares its data and returns (run, setup, number): run is timed
+# number times per round, setup (optional) runs untimed before each call and its result is
+# passed to run.
+
+BENCHMARKS = {}
+# Rows processed per call of the sized benchmarks, to report the cost per row
+ROWS = {}
+
+
+def benchmark(name):
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def sized(name, func, sizes):
+    for size in sizes:
+        BENCHMARKS[f'{name}[{size}]'] = lambda size=size: func(size)
+        ROWS[f'{name}[{size}]'] = size
+
+
+def inventory_to_dict(size):
+    seed_inventory(size, random.Random(SEED))
+    items = db.session.execute(select(Inventory).order_by(Inventory.id)).scalars().all()
+    return (lambda _: [item.to_dict() for item in items]), None, 1
+
+
+def pastebin_to_dict(size):
+    seed_pastes(size, random.Random(SEED))
+    pastes = db.session.execute(
+        select(Pastebin).options(joinedload(Pastebin.blob).undefer(PasteBlob.data))
+    ).unique().scalars().all()
+    return (lambda _: [paste.to_dict() for paste in pastes]), None, 1
+
+
+def jsonify_list(size):
+    seed_inventory(size, random.Random(SEED))
+    rows = [item.to_dict() for item in Inventory.query.order_by(Inventory.id)]
+
+    def run(_):
+        with app.test_request_context():
+            jsonify(rows).get_data()
+    return run, None, 1
+
+
+# Loading and serializing the whole inventory, as GET /database/ does: ORM objects and to_dict()
+# with the standard library (the read path before the Core fast path), plain rows with the standard
+# library, and plain rows with the app's JSON provider (orjson when installed)
+
+def inventory_json_orm_stdlib(size):
+    seed_inventory(size, random.Random(SEED))
+    provider = stdlib_json_provider()
+
+    def run(_):
+        items = db.session.execute(select(Inventory).order_by(Inventory.id)).scalars().all()
+        provider.dumps_bytes([item.to_dict() for item in items])
+        db.session.expunge_all()
+    return run, None, 1
+
+
+def inventory_json_core_stdlib(size):
+    seed_inventory(size, random.Random(SEED))
+    provider = stdlib_json_provider()
+    return (lambda _: provider.dumps_bytes(
+        inventory_dicts(db.session.execute(select(*INVENTORY_COLUMNS).order_by(Inventory.id)))
+    )), None, 1
+
+
+def inventory_json_core_fast(size):
+    seed_inventory(size, random.Random(SEED))
+    return (lambda _: app.json.dumps_bytes(
+        inventory_dicts(db.session.execute(select(*INVENTORY_COLUMNS).order_by(Inventory.id)))
+    )), None, 1
+
+
+def get_inventory(size):
+    seed_inventory(size, random.Random(SEED))
+    client = app.test_client()
+    return (lambda _: check(client.get('/database/'), 200)), None, 1
+
+
+def stdlib_json_provider():
+    provider = FastJSONProvider(app)
+    provider.backend = 'stdlib'
+    return provider
+
+
+def inventory_search(size):
+    seed_inventory(size, random.Random(SEED))
+    client = app.test_client()
+    # A name prefix search, a range filter and a sort order, each returning one page
+    urls = ['/database/?q=item-12&limit=100', '/database/?min_price=100&max_price=110&sort=-quantity&limit=100',
+            '/database/?sort=name&limit=100']
+
+    def run(_):
+        for url in urls:
+            check(client.get(url), 200)
+    return run, None, 10
+
+
+BATCH_SIZE = 100
+
+
+@benchmark(f'insert_single[{BATCH_SIZE}]')
+def insert_single():
+    client = app.test_client()
+    rng = random.Random(SEED)
+    payloads = [{'name': f'single-{i}', 'quantity': rng.randrange(100), 'price': 1.0} for i in range(BATCH_SIZE)]
+
+    def run(_):
+        for payload in payloads:
+            check(client.post('/database/', json=payload), 201)
+    return run, None, 1
+
+
+@benchmark(f'insert_bulk[{BATCH_SIZE}]')
+def insert_bulk():
+    client = app.test_client()
+    rng = random.Random(SEED)
+    operations = [{'op': 'create', 'name': f'bulk-{i}', 'quantity': rng.randrange(100), 'price': 1.0}
+                  for i in range(BATCH_SIZE)]
+    return (lambda _: check(client.post('/database/batch', json=operations), 200)), None, 1
+
+
+@benchmark('get_paste[hit]')
+def get_paste_hit():
+    client = app.test_client()
+    paste_id = new_paste('cached paste ' * 50, datetime.utcnow() + timedelta(hours=1))
+    check(client.get(f'/pastebin/{paste_id}'), 200)  # Fill the cache
+    return (lambda _: check(client.get(f'/pastebin/{paste_id}'), 200)), None, 200
+
+
+@benchmark('get_paste[miss]')
+def get_paste_miss():
+    client = app.test_client()
+    paste_id = new_paste('uncached paste ' * 50, datetime.utcnow() + timedelta(hours=1))
+    return (lambda _: check(client.get(f'/pastebin/{paste_id}'), 200)), (lambda: paste_cache.invalidate([paste_id])), 100
+
+
+@benchmark('get_paste[expired]')
+def get_paste_expired():
+    client = app.test_client()
+    past = datetime.utcnow() - timedelta(minutes=1)
+    return (
+        (lambda paste_id: check(client.get(f'/pastebin/{paste_id}'), 404)),
+        (lambda: new_paste(f'expired paste {random.random()}', past)),
+        50,
+    )
+
+
+@benchmark('init_db[cold]')
+def init_db_cold():
+    def setup():
+        path = os.path.join(TMP_DIR, f'cold-{os.urandom(4).hex()}.db')
+        cold_app = Flask('cold_start')
+        cold_app.config.update(app.config)
+        cold_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+        return cold_app
+
+    def run(cold_app):
+        init_db(cold_app)
+        with cold_app.app_context():
+            db.engine.dispose()
+    return run, setup, 10
+
+
+# --- Timing ---
+
+def time_benchmark(name, rounds):
+    with app.app_context():
+        run, setup, number = BENCHMARKS[name]()
+        per_call = []
+        for round_index in range(rounds + 1):  # The first round is a warmup
+            elapsed = 0
+            gc.collect()
+            gc.disable()
+            try:
+                for _ in range(number):
+                    arg = setup() if setup else None
+                    start = time.perf_counter_ns()
+                    run(arg)
+                    elapsed += time.perf_counter_ns() - start
+            finally:
+                gc.enable()
+            if round_index:
+                per_call.append(elapsed / number)
+        db.session.remove()
+    return {
+        'rounds': rounds,
+        'calls_per_round': number,
+        'min_ns': min(per_call),
+        'median_ns': statistics.median(per_call),
+        'mean_ns': statistics.fmean(per_call),
+        'stdev_ns': statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+    }
+
+
+def format_ns(ns):
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f'{ns / scale:.2f} {unit}'
+    return f'{ns:.0f} ns'
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SRC_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000', help='row counts for the sized (per-row) benchmarks')
+    parser.add_argument('--rounds', type=int, default=7, help='timed rounds per benchmark (default: 7)')
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of another run to compare medians with')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    sized('inventory_to_dict', inventory_to_dict, sizes)
+    sized('pastebin_to_dict', pastebin_to_dict, sizes)
+    sized('jsonify_list', jsonify_list, sizes)
+    sized('inventory_search', inventory_search, sizes)
+    sized('inventory_json_orm_stdlib', inventory_json_orm_stdlib, sizes)
+    sized('inventory_json_core_stdlib', inventory_json_core_stdlib, sizes)
+    sized('inventory_json_core_fast', inventory_json_core_fast, sizes)
+    sized('get_inventory', get_inventory, sizes)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    header = f"{'benchmark':<34} {'median':>11} {'min':>11} {'stdev':>9} {'per row':>9}"
+    print(header + (f" {'vs base':>9}" if baseline else ''))
+    try:
+        for name in BENCHMARKS:
+            if args.filter and args.filter not in name:
+                continue
+            result = results[name] = time_benchmark(name, args.rounds)
+            per_row = format_ns(result['median_ns'] / ROWS[name]) if name in ROWS else ''
+            line = (f"{name:<34} {format_ns(result['median_ns']):>11} {format_ns(result['min_ns']):>11} "
+                    f"{result['stdev_ns'] / result['median_ns']:>8.1%} {per_row:>9}")
+            if name in baseline:
+                line += f" {result['median_ns'] / baseline[name]['median_ns']:>8.2f}x"
+            print(line)
+    finally:
+        # Write the pending metrics now; at exit their directory is gone
+        shared_stats.flush_all()
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': git_commit(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'sizes': sizes,
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                },
+                'results': results,
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
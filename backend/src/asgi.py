@@ -0,0 +1,225 @@
+"""
+ASGI entry point of the DevOps Lab Kit API, for serving the app with uvicorn:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+
+Requests are handled by the same Flask app (and therefore the same URLs) as under gunicorn.
+Each view runs on a bounded thread pool while the event loop does all socket I/O, so a worker
+keeps serving other requests while one waits on a SQLite lock or sends a large paste to a
+slow client: a thread is only held while application code runs, never while a client reads.
+The inventory change feed (/database/events) is served natively on the event loop, so idle
+subscribers hold no thread at all; see change_feed.py.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app
+from change_feed import ASGIEventStream, ChangeFeed
+from database import db
+
+# Request bodies up to this size are buffered in memory, larger ones in a temporary file
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+_END = object()
+
+
+def _write_not_supported(data):
+    raise NotImplementedError("The write() callable of start_response is not supported")
+
+
+class WSGIThreadPoolAdapter:
+    """
+    Runs a WSGI application under an ASGI server. The application call and every step of the
+    response iterator run on a thread pool of max_threads threads; sending each chunk is awaited
+    on the event loop, so a streamed response is paced by the client without holding a thread.
+    max_threads should not exceed the database connection pool (pool_size + max_overflow), or
+    threads will queue for connections instead of for the pool. Requests with a body larger than
+    max_body_bytes are answered with 413 before the application sees them.
+    """
+
+    def __init__(self, wsgi_app, max_threads, max_body_bytes):
+        self.wsgi_app = wsgi_app
+        self.max_body_bytes = max_body_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _run(self, context, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, context.run, func, *args)
+
+    async def _http(self, scope, receive, send):
+        declared = dict(scope['headers']).get(b'content-length', b'')
+        if declared.isdigit() and int(declared) > self.max_body_bytes:
+            await self._body_too_large(send)
+            return
+        # Chunked uploads have no Content-Length, so the size is also checked while reading
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                body.close()
+                await self._body_too_large(send)
+                return
+            body.write(chunk)
+            more_body = message.get('more_body', False)
+        body.seek(0)
+
+        # Stop producing the response once the client has gone away
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch_disconnect())
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return _write_not_supported
+
+        async def send_start():
+            if not response.get('sent'):
+                response['sent'] = True
+                await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+
+        # Every step of a request runs in the same context (though maybe on different threads),
+        # so the Flask request context pushed by a streamed response stays visible to it
+        context = contextvars.copy_context()
+        try:
+            iterable = await self._run(context, self.wsgi_app, self._environ(scope, body, size), start_response)
+            try:
+                iterator = iter(iterable)
+                while not disconnected.is_set():
+                    chunk = await self._run(context, next, iterator, _END)
+                    if chunk is _END:
+                        break
+                    await send_start()
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                await send_start()
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(iterable, 'close'):
+                    # Runs teardown callbacks (e.g. the request context of a streamed response)
+                    await self._run(context, iterable.close)
+        finally:
+            watcher.cancel()
+            body.close()
+
+    async def _body_too_large(self, send):
+        body = json.dumps({"error": f"Request body exceeds the maximum size of {self.max_body_bytes} bytes"}).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': 413, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode('latin-1')),
+            (b'connection', b'close'),
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    def _environ(scope, body, size):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            # The body has been read completely, so its length is known even for chunked uploads
+            'wsgi.input_terminated': True,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_LENGTH':
+                continue  # Set from the body that was read below
+            if name == 'CONTENT_TYPE':
+                key = name
+            else:
+                key = f'HTTP_{name}'
+            if key in environ:
+                value = f"{environ[key]}{'; ' if key == 'HTTP_COOKIE' else ','}{value}"
+            environ[key] = value
+        environ['CONTENT_LENGTH'] = str(size)
+        return environ
+
+
+# Defaults to the size of the database connection pool, see DB_POOL_SIZE and DB_MAX_OVERFLOW
+ASGI_THREADS = int(os.environ.get(
+    'ASGI_THREADS',
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] + app.config['SQLALCHEMY_ENGINE_OPTIONS']['max_overflow']
+))
+
+# Large enough for a paste of PASTE_MAX_BYTES sent as JSON, where escaping can double its size
+ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 2 * app.config['PASTE_MAX_BYTES']))
+
+wsgi_application = WSGIThreadPoolAdapter(app, max_threads=ASGI_THREADS, max_body_bytes=ASGI_MAX_BODY_BYTES)
+
+
+def _query(func):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            return func(connection)
+
+
+async def run_query(func):
+    """Runs func with a database connection on the thread pool of the WSGI application."""
+    return await asyncio.get_running_loop().run_in_executor(wsgi_application.executor, _query, func)
+
+
+inventory_events = ASGIEventStream(
+    ChangeFeed(run_query, app.config['SSE_POLL_INTERVAL_SECONDS'], app.logger),
+    keepalive_seconds=app.config['SSE_KEEPALIVE_SECONDS']
+)
+
+
+async def application(scope, receive, send):
+    """Serves the inventory change feed on the event loop and every other request through the Flask app."""
+    if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == '/database/events':
+        await inventory_events(scope, receive, send)
+    else:
+        await wsgi_application(scope, receive, send)
@@ -0,0 +1,223 @@
+"""
+This module contains the inventory change feed, served as Server-Sent Events on /database/events.
+
+Triggers record every insert, update and delete of an inventory item in the inventory_change
+table, whichever worker or code path made it. Event streams read that table, so a change made in
+one worker reaches the subscribers of every other worker, and the ID of each change doubles as
+its event ID: a client reconnecting with Last-Event-ID resumes exactly where it stopped.
+
+Under the ASGI server (asgi.py) each worker runs a single ChangeFeed task that polls the table
+for all of its subscribers, and an idle subscriber costs a socket and a queue, not a thread.
+Under gunicorn the /database/events view polls on its own, holding a worker thread per stream.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qsl
+
+from sqlalchemy import func, select
+
+from database import InventoryChange
+
+# Clients wait this long before reconnecting after a stream ends
+RETRY_MS = 1000
+# Changes read per query
+BATCH_SIZE = 500
+# Batches a subscriber may fall behind before its stream is closed. The client reconnects with
+# Last-Event-ID and catches up from the database, so a slow client never holds up the others.
+SUBSCRIBER_MAX_BACKLOG = 100
+
+KEEPALIVE = ": keepalive\n\n"
+
+
+class InvalidLastEventId(ValueError):
+    pass
+
+
+def parse_last_event_id(header_value, query_value):
+    """
+    Returns the change ID a client has seen, from the Last-Event-ID header or (for the first
+    connection of an EventSource, which can't set headers) the last_event_id query parameter.
+    Returns None for new clients.
+    """
+    raw = header_value or query_value
+    if raw is None or raw == '':
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        raise InvalidLastEventId("Last-Event-ID must be a non-negative integer")
+    if value < 0:
+        raise InvalidLastEventId("Last-Event-ID must be a non-negative integer")
+    return value
+
+
+def read_changes(connection, after_id, limit=BATCH_SIZE):
+    """Returns up to limit changes with an ID greater than after_id, oldest first."""
+    return connection.execute(
+        select(InventoryChange.__table__).where(InventoryChange.id > after_id).order_by(InventoryChange.id).limit(limit)
+    ).all()
+
+
+def resume_position(connection, last_event_id):
+    """
+    Returns a tuple of (after_id, reset) for a client that has seen changes up to last_event_id.
+    New clients start after the latest change. reset is True when the changes the client missed
+    are no longer in the log (or the log is from another database); it must then reload the
+    inventory and continue from after_id.
+    """
+    oldest, latest = connection.execute(select(func.min(InventoryChange.id), func.max(InventoryChange.id))).one()
+    latest = latest or 0
+    if last_event_id is None:
+        return latest, False
+    if last_event_id > latest or (oldest is not None and last_event_id < oldest - 1):
+        return latest, True
+    return last_event_id, False
+
+
+def format_event(change):
+    """Formats a change as a Server-Sent Event."""
+    if change.op == 'delete':
+        data = {"id": change.item_id}
+    else:
+        data = {"id": change.item_id, "name": change.name, "quantity": change.quantity, "price": change.price}
+    return f"id: {change.id}\nevent: {change.op}\ndata: {json.dumps(data)}\n\n"
+
+
+def format_reset(after_id):
+    """Event telling the client to reload the inventory; its ID is where the stream continues."""
+    return f"id: {after_id}\nevent: reset\ndata: {{}}\n\n"
+
+
+def format_retry():
+    return f"retry: {RETRY_MS}\n\n"
+
+
+class ChangeFeed:
+    """
+    Fans the change log out to the event streams of this process. One task polls the database for
+    all subscribers, so the load on SQLite does not grow with their number; it runs while there
+    are subscribers. run_query is a coroutine function that calls its argument with a database
+    connection (on a thread pool) and returns the result.
+    """
+
+    def __init__(self, run_query, poll_interval, logger):
+        self.run_query = run_query
+        self.poll_interval = poll_interval
+        self.logger = logger
+        self.position = None
+        self._subscribers = set()
+        self._task = None
+
+    def subscribe(self, after_id):
+        """
+        Returns a tuple of (queue, position): the queue receives every batch of changes after
+        position. A subscriber that has seen less must read the changes up to position itself.
+        A None in the queue means that the subscriber fell behind and was dropped.
+        """
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        if self._task is None:
+            self.position = after_id
+            self._task = asyncio.create_task(self._poll())
+        return queue, self.position
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    async def _poll(self):
+        try:
+            while self._subscribers:
+                changes = await self.run_query(lambda connection: read_changes(connection, self.position))
+                if changes:
+                    self.position = changes[-1].id
+                    for queue in list(self._subscribers):
+                        if queue.qsize() >= SUBSCRIBER_MAX_BACKLOG:
+                            self._subscribers.discard(queue)
+                            queue.put_nowait(None)
+                        else:
+                            queue.put_nowait(changes)
+                if len(changes) < BATCH_SIZE:
+                    await asyncio.sleep(self.poll_interval)
+        except Exception as e:
+            # End all streams; the clients reconnect and resume from their Last-Event-ID
+            self.logger.error("Error polling the inventory change log: %s", e)
+            for queue in self._subscribers:
+                queue.put_nowait(None)
+            self._subscribers.clear()
+        finally:
+            self._task = None
+
+
+class ASGIEventStream:
+    """ASGI endpoint streaming the changes of a ChangeFeed as Server-Sent Events."""
+
+    def __init__(self, feed, keepalive_seconds):
+        self.feed = feed
+        self.keepalive_seconds = keepalive_seconds
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope['headers'])
+        query = dict(parse_qsl(scope['query_string'].decode('latin-1')))
+        try:
+            last_event_id = parse_last_event_id(headers.get(b'last-event-id', b'').decode('latin-1'),
+                                                query.get('last_event_id'))
+        except InvalidLastEventId as e:
+            body = json.dumps({"error": str(e)}).encode('utf-8')
+            await send({'type': 'http.response.start', 'status': 400,
+                        'headers': [(b'content-type', b'application/json'), (b'access-control-allow-origin', b'*')]})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        disconnected = asyncio.Event()
+        queue = None
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+            if queue is not None:
+                queue.put_nowait(None)  # Wake the stream up
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            after_id, reset = await self.feed.run_query(lambda connection: resume_position(connection, last_event_id))
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),  # Keep nginx from buffering the stream
+                (b'access-control-allow-origin', b'*'),
+            ]})
+            await self._send(send, format_retry() + (format_reset(after_id) if reset else ''))
+
+            queue, position = self.feed.subscribe(after_id)
+            # Catch up on the changes the feed had already passed when this client subscribed
+            while after_id < position:
+                changes = await self.feed.run_query(lambda connection: read_changes(connection, after_id))
+                if not changes:
+                    break
+                await self._send(send, ''.join(format_event(change) for change in changes))
+                after_id = changes[-1].id
+
+            while not disconnected.is_set():
+                try:
+                    changes = await asyncio.wait_for(queue.get(), self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    await self._send(send, KEEPALIVE)
+                    continue
+                if changes is None:
+                    break  # Disconnected, or fell behind and resumes from the database after reconnecting
+                events = ''.join(format_event(change) for change in changes if change.id > after_id)
+                if events:
+                    await self._send(send, events)
+                    after_id = changes[-1].id
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        except OSError:
+            pass  # The client went away while we were sending
+        finally:
+            if queue is not None:
+                self.feed.unsubscribe(queue)
+            watcher.cancel()
+
+    @staticmethod
+    async def _send(send, text):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
@@ -0,0 +1,174 @@
+"""
+This module contains the response compression middleware of the DevOps Lab Kit API.
+
+Responses are compressed with gzip or deflate when the client accepts it, the body is at least
+a minimum size and its content type compresses well. Responses that are already encoded (the
+precomputed static responses and gzip-stored pastes) pass through untouched. Streamed responses
+are compressed chunk by chunk, so they keep streaming.
+"""
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+# Window bits of zlib.compressobj for each Content-Encoding ('deflate' is the zlib format)
+ENCODINGS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+# Bodies of known length up to this size are compressed in one piece and sent with their
+# compressed Content-Length; longer ones are compressed while streaming
+BUFFER_MAX_BYTES = 1024 * 1024
+
+DEFAULT_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml',
+    'text/plain', 'text/html', 'text/css', 'text/javascript',
+)
+
+
+def choose_encoding(accept_encoding):
+    """Returns the supported encoding the client prefers (gzip on a tie), or None."""
+    accepted = parse_accept_header(accept_encoding)
+    quality = {encoding: accepted[encoding] for encoding in ENCODINGS}
+    best = max(quality, key=lambda encoding: quality[encoding])
+    return best if quality[best] > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware compressing responses negotiated via Accept-Encoding.
+    Only responses whose Content-Type is in mimetypes and whose body is at least min_bytes long
+    (or of unknown length) are compressed, with the given zlib level (1-9).
+    """
+
+    def __init__(self, wsgi_app, level=6, min_bytes=1024, mimetypes=DEFAULT_MIMETYPES):
+        self.wsgi_app = wsgi_app
+        self.level = level
+        self.min_bytes = min_bytes
+        self.mimetypes = frozenset(mimetypes)
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None or environ['REQUEST_METHOD'] == 'HEAD':
+            return self.wsgi_app(environ, start_response)
+
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            if exc_info and captured.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            captured.update(status=status, headers=headers, exc_info=exc_info)
+            return self._write_not_supported
+
+        iterable = self.wsgi_app(environ, capture_start_response)
+        status, headers = captured['status'], captured['headers']
+        length = self._compressible_length(status, headers)
+        if length is False:
+            captured['sent'] = True
+            start_response(status, headers, captured['exc_info'])
+            return iterable
+
+        headers = self._encoded_headers(headers, encoding)
+        if length is not None and length <= BUFFER_MAX_BYTES:
+            try:
+                body = b''.join(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+            if len(body) < self.min_bytes:
+                # Content-Length was missing or wrong; send the body as it is
+                captured['sent'] = True
+                start_response(status, captured['headers'], captured['exc_info'])
+                return [body]
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, ENCODINGS[encoding])
+            body = compressor.compress(body) + compressor.flush()
+            captured['sent'] = True
+            start_response(status, headers + [('Content-Length', str(len(body)))], captured['exc_info'])
+            return [body]
+
+        captured['sent'] = True
+        start_response(status, headers, captured['exc_info'])
+        return self._compress_stream(iterable, encoding)
+
+    def _compressible_length(self, status, headers):
+        """
+        Returns False if the response must be sent as it is, otherwise its Content-Length
+        (None if unknown, e.g. for streamed responses).
+        """
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        length = None
+        for name, value in headers:
+            name = name.lower()
+            if name == 'content-encoding':
+                return False  # Already encoded
+            if name == 'content-type' and value.split(';', 1)[0].strip().lower() not in self.mimetypes:
+                return False
+            if name == 'cache-control' and 'no-transform' in value.lower():
+                return False
+            if name == 'content-length':
+                length = int(value)
+        if not any(name.lower() == 'content-type' for name, _ in headers):
+            return False
+        if length is not None and length < self.min_bytes:
+            return False
+        return length
+
+    @staticmethod
+    def _encoded_headers(headers, encoding):
+        """Headers of the compressed response, without Content-Length."""
+        encoded = []
+        vary = None
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'content-length':
+                continue
+            if lower == 'vary':
+                vary = value
+                continue
+            if lower == 'etag' and not value.startswith('W/'):
+                # The compressed body is a different representation; a weak ETag still matches
+                # If-None-Match, which compares weakly
+                value = f'W/{value}'
+            encoded.append((name, value))
+        encoded.append(('Content-Encoding', encoding))
+        if vary and vary.strip() != '*':
+            if 'accept-encoding' not in vary.lower():
+                vary = f'{vary}, Accept-Encoding'
+        encoded.append(('Vary', vary or 'Accept-Encoding'))
+        return encoded
+
+    def _compress_stream(self, iterable, encoding):
+        return _CompressedStream(iterable, zlib.compressobj(self.level, zlib.DEFLATED, ENCODINGS[encoding]))
+
+    @staticmethod
+    def _write_not_supported(data):
+        raise NotImplementedError("The write() callable of start_response is not supported")
+
+
+class _CompressedStream:
+    """
+    Compresses the chunks of a response iterable. close() always closes the inner iterable (and
+    so runs the response's close callbacks), even when the server closes the response before
+    reading from it, which a generator's finally block would miss.
+    """
+
+    def __init__(self, iterable, compressor):
+        self._iterable = iterable
+        self._iterator = iter(iterable)
+        self._compressor = compressor
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._compressor is None:
+            raise StopIteration
+        for chunk in self._iterator:
+            if chunk:
+                # Every chunk is flushed, so a streamed response reaches the client as it is produced
+                return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        data, self._compressor = self._compressor.flush(), None
+        return data
+
+    def close(self):
+        if hasattr(self._iterable, 'close'):
+            self._iterable.close()
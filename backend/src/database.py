@@ -1,8 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import inspect as sqlalchemy_inspect # Rename to avoid conflict
+from sqlalchemy import event, select, inspect as sqlalchemy_inspect # Rename to avoid conflict
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.schema import CreateColumn
 # Import the specific exception type
 from sqlalchemy.exc import OperationalError
 from datetime import datetime, timedelta
+import gzip
 
 # Initialize SQLAlchemy without an app object initially
 db = SQLAlchemy()
@@ -13,53 +17,524 @@ class Inventory(db.Model):
     name = db.Column(db.String(80), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
+    # Incremented by every update, for optimistic locking with If-Match
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    # One index per sortable column, ending with id so that range filters, ORDER BY <column>, id
+    # and the keyset cursor (<column>, id) > (?, ?) are all answered from the index
+    __table_args__ = (
+        db.Index('ix_inventory_name_id', 'name', 'id'),
+        db.Index('ix_inventory_quantity_id', 'quantity', 'id'),
+        db.Index('ix_inventory_price_id', 'price', 'id'),
+    )
 
     def to_dict(self):
         return {
             "id": self.id,
             "name": self.name,
             "quantity": self.quantity,
-            "price": self.price
+            "price": self.price,
+            "version": self.version
         }
 
+# Read paths that return many items select these columns as plain rows, skipping the ORM's
+# identity map and per-object state; inventory_dicts() turns the rows into to_dict() output
+INVENTORY_COLUMNS = (Inventory.id, Inventory.name, Inventory.quantity, Inventory.price, Inventory.version)
+INVENTORY_FIELDS = tuple(column.key for column in INVENTORY_COLUMNS)
+
+def inventory_dicts(rows):
+    """Returns the to_dict() representation of rows selected with INVENTORY_COLUMNS."""
+    return [dict(zip(INVENTORY_FIELDS, row)) for row in rows]
+
+class TableVersion(db.Model):
+    """
+    Per-table change counter, incremented by SQLite triggers on every insert, update and delete
+    of the VERSIONED_TABLES, whichever code path writes them. Used for ETags.
+    """
+    __tablename__ = 'table_version'
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+VERSIONED_TABLES = ('inventory',)
+
+def get_table_version(name):
+    """Returns the current version of a table (0 if it was never modified)."""
+    return db.session.scalar(select(TableVersion.version).where(TableVersion.name == name)) or 0
+
+class TableRowCount(db.Model):
+    """Number of rows per table, maintained by SQLite triggers so reading it never scans the table."""
+    __tablename__ = 'table_row_count'
+    name = db.Column(db.String(64), primary_key=True)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Tables whose rows are counted in table_row_count, see create_triggers
+ROW_COUNTED_TABLES = ('inventory', 'pastebin')
+
+def get_row_counts():
+    """Returns the maintained row count of every table in ROW_COUNTED_TABLES."""
+    counts = dict(db.session.execute(select(TableRowCount.name, TableRowCount.row_count)).all())
+    return {name: counts.get(name, 0) for name in ROW_COUNTED_TABLES}
+
+# --- Inventory Search ---
+# FTS5 index of the inventory names. It is an external content table: it stores only the index and
+# reads the names from inventory, and triggers keep it in sync (see SQLITE_TRIGGERS). The table is
+# not part of db.metadata, since create_all can't create virtual tables; see create_search_index.
+inventory_fts = Table('inventory_fts', MetaData(), Column('rowid', Integer), Column('name', String))
+
+INVENTORY_FTS_DDL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS inventory_fts USING fts5(
+        name, content='inventory', content_rowid='id', tokenize='unicode61', prefix='2 3'
+    )
+"""
+
+def fts_prefix_query(text):
+    """
+    Turns free text into an FTS5 query matching names that contain every word, the last one
+    as a prefix. Words are quoted, so FTS5 operators and punctuation in the input are literal.
+    Returns None if the text contains no words.
+    """
+    words = text.split()
+    if not words:
+        return None
+    quoted = ['"' + word.replace('"', '""') + '"' for word in words]
+    return ' '.join(quoted) + '*'
+
+# --- Inventory Summary ---
+class InventorySummary(db.Model):
+    """
+    Single-row aggregate of the inventory, kept current by SQLite triggers so reading it never
+    scans the table. Also records the settings the low-stock count and price buckets were built
+    with; see sync_inventory_summary.
+    """
+    __tablename__ = 'inventory_summary'
+    id = db.Column(db.Integer, primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+    total_value = db.Column(db.Float, nullable=False, default=0.0)  # Sum of quantity * price
+    low_stock_count = db.Column(db.Integer, nullable=False, default=0)  # Items below low_stock_threshold
+    low_stock_threshold = db.Column(db.Integer, nullable=False)
+    price_buckets = db.Column(db.String(255), nullable=False)  # Comma-separated bucket boundaries
+
+class InventoryPriceBucket(db.Model):
+    """Items and their total quantity per price range. Bucket i holds prices below boundary i."""
+    __tablename__ = 'inventory_price_bucket'
+    bucket = db.Column(db.Integer, primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+
+SUMMARY_TRIGGER_NAMES = ('inventory_summary_insert', 'inventory_summary_delete', 'inventory_summary_update')
+
+def _price_bucket_sql(row, price_buckets):
+    """SQL expression of the price bucket of row (NEW, OLD or inventory)."""
+    cases = ' '.join(f"WHEN {row}.price < {bound!r} THEN {i}" for i, bound in enumerate(price_buckets))
+    return f"CASE {cases} ELSE {len(price_buckets)} END" if cases else "0"
+
+def _summary_trigger_ddl(low_stock_threshold, price_buckets):
+    """
+    Builds the triggers applying each inserted, deleted or updated row to the summary.
+    The settings are baked into the SQL, which is why the triggers are rebuilt when they change.
+    """
+    def apply(row, sign):
+        return f"""
+            UPDATE inventory_summary SET
+                item_count = item_count {sign} 1,
+                total_quantity = total_quantity {sign} {row}.quantity,
+                total_value = total_value {sign} {row}.quantity * {row}.price,
+                low_stock_count = low_stock_count {sign} ({row}.quantity < {int(low_stock_threshold)})
+            WHERE id = 1;
+            UPDATE inventory_price_bucket SET
+                item_count = item_count {sign} 1,
+                total_quantity = total_quantity {sign} {row}.quantity
+            WHERE bucket = {_price_bucket_sql(row, price_buckets)};
+        """
+
+    return [
+        f"CREATE TRIGGER inventory_summary_insert AFTER INSERT ON inventory BEGIN {apply('NEW', '+')} END",
+        f"CREATE TRIGGER inventory_summary_delete AFTER DELETE ON inventory BEGIN {apply('OLD', '-')} END",
+        f"""CREATE TRIGGER inventory_summary_update AFTER UPDATE OF quantity, price ON inventory
+            BEGIN {apply('OLD', '-')} {apply('NEW', '+')} END""",
+    ]
+
+def sync_inventory_summary(engine, low_stock_threshold, price_buckets):
+    """
+    Makes sure the inventory summary is maintained with the given settings.
+    When they match the settings stored with the summary this is a single query. Otherwise (on
+    the first start, or after INVENTORY_LOW_STOCK_THRESHOLD or INVENTORY_PRICE_BUCKETS changed)
+    the triggers are rebuilt and the summary is recomputed from the inventory, in one transaction.
+    Returns whether the summary was rebuilt; always False on databases other than SQLite, where
+    the summary is not maintained.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    buckets_setting = ','.join(repr(bound) for bound in price_buckets)
+    with engine.connect() as connection:
+        stored = connection.execute(
+            select(InventorySummary.low_stock_threshold, InventorySummary.price_buckets).where(InventorySummary.id == 1)
+        ).first()
+    if stored is not None and tuple(stored) == (low_stock_threshold, buckets_setting):
+        return False
+
+    with engine.begin() as connection:
+        for name in SUMMARY_TRIGGER_NAMES:
+            connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+        connection.execute(delete(InventorySummary))
+        connection.execute(delete(InventoryPriceBucket))
+        connection.execute(insert(InventorySummary).values(
+            id=1, item_count=0, total_quantity=0, total_value=0.0, low_stock_count=0,
+            low_stock_threshold=low_stock_threshold, price_buckets=buckets_setting
+        ))
+        connection.execute(insert(InventoryPriceBucket), [
+            {'bucket': i, 'item_count': 0, 'total_quantity': 0} for i in range(len(price_buckets) + 1)
+        ])
+        for ddl in _summary_trigger_ddl(low_stock_threshold, price_buckets):
+            connection.exec_driver_sql(ddl)
+        # Aggregate the existing rows once; from now on the triggers apply every change
+        connection.exec_driver_sql(f"""
+            UPDATE inventory_summary SET (item_count, total_quantity, total_value, low_stock_count) = (
+                SELECT COUNT(*), COALESCE(SUM(quantity), 0), COALESCE(SUM(quantity * price), 0.0),
+                       COALESCE(SUM(quantity < {int(low_stock_threshold)}), 0)
+                FROM inventory
+            ) WHERE id = 1
+        """)
+        connection.exec_driver_sql(f"""
+            INSERT INTO inventory_price_bucket (bucket, item_count, total_quantity)
+            SELECT {_price_bucket_sql('inventory', price_buckets)} AS bucket, COUNT(*), SUM(quantity)
+            FROM inventory WHERE true GROUP BY bucket
+            ON CONFLICT (bucket) DO UPDATE SET item_count = excluded.item_count, total_quantity = excluded.total_quantity
+        """)
+    return True
+
+def get_inventory_summary():
+    """Returns the inventory summary row and its price buckets, or (None, []) if it was never built."""
+    summary = db.session.get(InventorySummary, 1)
+    buckets = db.session.execute(select(InventoryPriceBucket).order_by(InventoryPriceBucket.bucket)).scalars().all()
+    return summary, buckets
+
+# --- Inventory Change Log ---
+# Number of changes kept for resuming event streams; a trigger deletes older entries
+INVENTORY_CHANGE_LOG_ROWS = 10000
+
+class InventoryChange(db.Model):
+    """
+    One insert, update or delete of an inventory item, written by SQLite triggers. IDs increase
+    with every change and are never reused, so they serve as event IDs of the change feed.
+    """
+    __tablename__ = 'inventory_change'
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    op = db.Column(db.String(10), nullable=False)  # 'create', 'update' or 'delete'
+    item_id = db.Column(db.Integer, nullable=False)
+    # The item after the change; NULL for deletes
+    name = db.Column(db.String(80))
+    quantity = db.Column(db.Integer)
+    price = db.Column(db.Float)
+
+# --- Paste Content Codecs ---
+# 'gzip' content can be sent to clients as-is with Content-Encoding: gzip
+PASTE_CODECS = ('identity', 'gzip')
+
+def encode_paste_content(raw, min_size=256, level=6):
+    """
+    Encodes UTF-8 paste content for storage. Returns a tuple of (codec, data).
+    Content is gzip-compressed when it is at least min_size bytes and compression actually saves space.
+    """
+    if len(raw) >= min_size:
+        # mtime=0 keeps the output deterministic for identical content
+        compressed = gzip.compress(raw, compresslevel=level, mtime=0)
+        if len(compressed) < len(raw):
+            return 'gzip', compressed
+    return 'identity', raw
+
+def decode_paste_content(codec, data):
+    """Decodes stored paste data back to UTF-8 bytes."""
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    return data
+
+class PasteBlob(db.Model):
+    """
+    Paste content stored once per distinct body, keyed by the SHA-256 digest of its UTF-8 bytes.
+    refcount is the number of pastes pointing at the blob; a trigger deletes the blob together
+    with its last paste.
+    """
+    __tablename__ = 'paste_blob'
+    digest = db.Column(db.String(64), primary_key=True)
+    codec = db.Column(db.String(10), nullable=False)
+    # Deferred so that loading a blob's metadata never pulls its content into memory
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))
+    size = db.Column(db.Integer, nullable=False)  # Uncompressed size in bytes
+    stored_size = db.Column(db.Integer, nullable=False)  # Size of data in bytes
+    refcount = db.Column(db.Integer, nullable=False, default=1)
+
 class Pastebin(db.Model):
     id = db.Column(db.String(32), primary_key=True)  # UUID hex
-    content = db.Column(db.Text, nullable=False)
+    # Content of current pastes lives in paste_blob. The inline columns below are only read for
+    # pastes stored by earlier versions: uncompressed text in content, or encoded data with a codec.
+    blob_digest = db.Column(db.String(64), db.ForeignKey('paste_blob.digest'))
+    content = db.Column(db.Text, nullable=False, default='')
+    data = db.Column(db.LargeBinary)
+    codec = db.Column(db.String(10))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    # Indexed so expiry sweeps only touch expired rows
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     content_type = db.Column(db.String(20), default="text/plain")
 
+    blob = db.relationship(PasteBlob)
+
+    def stored_content(self):
+        """Returns a tuple of (codec, data) with the paste content as stored."""
+        if self.blob_digest is not None:
+            return self.blob.codec, self.blob.data
+        if self.codec is not None:
+            return self.codec, self.data
+        return 'identity', self.content.encode('utf-8')
+
+    def get_text(self):
+        """Returns the paste text, decoding it if necessary."""
+        return decode_paste_content(*self.stored_content()).decode('utf-8')
+
     def to_dict(self):
         return {
             "id": self.id,
-            "content": self.content,
+            "content": self.get_text(),
             "created_at": self.created_at.isoformat() + "Z",
             "expires_at": self.expires_at.isoformat() + "Z",
             "content_type": self.content_type
         }
 
-def init_db(app):
-    """Initializes the database and creates tables if they don't exist."""
+# --- Schema Upgrades ---
+# Version of the schema defined in this module. Bump it whenever a model, index or trigger
+# changes, so that databases stamped with an older version are migrated at the next start.
+SCHEMA_VERSION = 7
+
+class SchemaVersion(db.Model):
+    """Single-row table recording the SCHEMA_VERSION the database was last migrated to."""
+    __tablename__ = 'schema_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+
+def get_schema_version(engine):
+    """Returns the schema version stamped in the database, or None if it was never stamped."""
+    try:
+        with engine.connect() as connection:
+            return connection.scalar(select(SchemaVersion.version).where(SchemaVersion.id == 1))
+    except OperationalError:
+        # No schema_version table yet
+        return None
+
+def add_missing_columns(engine):
+    """
+    Adds model columns that are missing from existing tables.
+    create_all only creates missing tables, so columns added to a model after its table was
+    created are added here with ALTER TABLE. New columns must be nullable or have a server default.
+    """
+    inspector = sqlalchemy_inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+
+# SQLite triggers that keep derived data consistent no matter which code path deletes rows
+SQLITE_TRIGGERS = [
+    # Release the paste's blob reference and drop the blob together with its last paste
+    """
+    CREATE TRIGGER IF NOT EXISTS pastebin_release_blob AFTER DELETE ON pastebin
+    WHEN OLD.blob_digest IS NOT NULL
+    BEGIN
+        UPDATE paste_blob SET refcount = refcount - 1 WHERE digest = OLD.blob_digest;
+        DELETE FROM paste_blob WHERE digest = OLD.blob_digest AND refcount <= 0;
+    END
+    """,
+]
+# Record every inventory change in inventory_change, keeping the latest INVENTORY_CHANGE_LOG_ROWS
+SQLITE_TRIGGERS += [
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_change_insert AFTER INSERT ON inventory
+    BEGIN
+        INSERT INTO inventory_change (op, item_id, name, quantity, price) VALUES ('create', NEW.id, NEW.name, NEW.quantity, NEW.price);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_change_update AFTER UPDATE ON inventory
+    BEGIN
+        INSERT INTO inventory_change (op, item_id, name, quantity, price) VALUES ('update', NEW.id, NEW.name, NEW.quantity, NEW.price);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_change_delete AFTER DELETE ON inventory
+    BEGIN
+        INSERT INTO inventory_change (op, item_id) VALUES ('delete', OLD.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_change_trim AFTER INSERT ON inventory_change
+    BEGIN
+        DELETE FROM inventory_change WHERE id <= NEW.id - {INVENTORY_CHANGE_LOG_ROWS};
+    END
+    """,
+]
+# Keep the inventory_fts index in sync with the inventory names
+SQLITE_TRIGGERS += [
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_fts_insert AFTER INSERT ON inventory
+    BEGIN
+        INSERT INTO inventory_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_fts_delete AFTER DELETE ON inventory
+    BEGIN
+        INSERT INTO inventory_fts (inventory_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_fts_update AFTER UPDATE OF name ON inventory
+    BEGIN
+        INSERT INTO inventory_fts (inventory_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+        INSERT INTO inventory_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END
+    """,
+]
+for _table in ROW_COUNTED_TABLES:
+    SQLITE_TRIGGERS += [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {_table}_count_insert AFTER INSERT ON {_table}
+        BEGIN
+            UPDATE table_row_count SET row_count = row_count + 1 WHERE name = '{_table}';
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {_table}_count_delete AFTER DELETE ON {_table}
+        BEGIN
+            UPDATE table_row_count SET row_count = row_count - 1 WHERE name = '{_table}';
+        END
+        """,
+    ]
+
+for _table in VERSIONED_TABLES:
+    SQLITE_TRIGGERS += [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {_table}_version_{_op.lower()} AFTER {_op} ON {_table}
+        BEGIN
+            UPDATE table_version SET version = version + 1 WHERE name = '{_table}';
+        END
+        """
+        for _op in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+def create_search_index(engine):
+    """Creates the inventory_fts index if it doesn't exist yet. create_triggers fills it."""
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.begin() as connection:
+        connection.exec_driver_sql(INVENTORY_FTS_DDL)
+
+def create_triggers(engine):
+    """
+    Creates the SQLite triggers if they don't exist yet.
+    The row counts are recounted, the table versions created and the search index rebuilt in the
+    same transaction, so they start out exact and every later write is applied by the triggers.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.begin() as connection:
+        for ddl in SQLITE_TRIGGERS:
+            connection.exec_driver_sql(ddl)
+        for table in ROW_COUNTED_TABLES:
+            connection.exec_driver_sql(
+                f"INSERT INTO table_row_count (name, row_count) SELECT '{table}', COUNT(*) FROM {table} "
+                "WHERE true ON CONFLICT (name) DO UPDATE SET row_count = excluded.row_count"
+            )
+        for table in VERSIONED_TABLES:
+            # Keeps the current version, so ETags handed out before the migration stay valid
+            connection.exec_driver_sql(f"INSERT OR IGNORE INTO table_version (name, version) VALUES ('{table}', 0)")
+        connection.exec_driver_sql("INSERT INTO inventory_fts (inventory_fts) VALUES ('rebuild')")
+
+# --- SQLite Tuning ---
+def sqlite_pragmas_from_config(config):
+    """Builds the per-connection SQLite pragmas from the app configuration."""
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'cache_size': config['SQLITE_CACHE_SIZE'],
+    }
+
+def register_sqlite_pragmas(engine, pragmas):
+    """
+    Applies the given pragmas to every new DBAPI connection of a SQLite engine.
+    Journal mode is stored in the database file, the other pragmas only last for the connection,
+    which is why they are set in a connect hook rather than once at startup.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def migrate_db(engine):
+    """
+    Brings the database schema up to SCHEMA_VERSION and stamps it.
+    Every step is idempotent, so this is safe to run against a database of any earlier version.
+    """
+    # Call create_all on the metadata object, passing the engine and checkfirst
+    db.metadata.create_all(bind=engine, checkfirst=True)
+    add_missing_columns(engine)
+    # create_all skips tables that already exist, so add indexes introduced after a table was created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    create_search_index(engine)
+    create_triggers(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            sqlite_insert(SchemaVersion)
+            .values(id=1, version=SCHEMA_VERSION)
+            .on_conflict_do_update(index_elements=[SchemaVersion.id], set_={'version': SCHEMA_VERSION})
+        )
+
+def init_db(app, auto_migrate=True):
+    """
+    Initializes the database.
+    When the database is already stamped with the current SCHEMA_VERSION, this is a single query:
+    no DDL and no schema introspection. Otherwise the schema is migrated, unless auto_migrate is
+    off, in which case 'flask --app app migrate-db' has to be run first.
+    """
     db.init_app(app)
     with app.app_context():
-        app.logger.info("Checking and creating database tables if they don't exist...")
+        register_sqlite_pragmas(db.engine, sqlite_pragmas_from_config(app.config))
+        version = get_schema_version(db.engine)
+        if version == SCHEMA_VERSION:
+            app.logger.debug("Database schema is at version %s.", version)
+            return
+        if not auto_migrate:
+            app.logger.error(
+                "Database schema is at version %s, expected %s. Run 'flask --app app migrate-db'.",
+                version, SCHEMA_VERSION
+            )
+            return
+        app.logger.info("Migrating database schema from version %s to %s...", version, SCHEMA_VERSION)
         try:
-            # Call create_all on the metadata object, passing the engine and checkfirst
-            db.metadata.create_all(bind=db.engine, checkfirst=True)
+            migrate_db(db.engine)
             app.logger.info("Database tables checked/created successfully.")
-            # Optional: Verify table existence
-            inspector = sqlalchemy_inspect(db.engine)
-            if 'inventory' in inspector.get_table_names():
-                app.logger.info("Verified 'inventory' table exists.")
-            else:
-                app.logger.warning("Warning: 'inventory' table not found after create_all().")
         except OperationalError as e:
             # Check if the error is specifically about the table already existing
             if "table inventory already exists" in str(e).lower():
                 app.logger.info("Info: Table 'inventory' already exists, skipping creation.")
             else:
                 # Log other OperationalErrors as actual errors
-                app.logger.error(f"Error during database initialization: {e}")
+                app.logger.error("Error during database initialization: %s", e)
         except Exception as e:
             # Catch any other unexpected errors during initialization
-            app.logger.error(f"Unexpected error during database initialization: {e}")
\ No newline at end of file
+            app.logger.error("Unexpected error during database initialization: %s", e)
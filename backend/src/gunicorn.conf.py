@@ -0,0 +1,158 @@
+"""
+gunicorn configuration for the DevOps Lab Kit API, loaded from the working directory by default:
+
+    gunicorn app:app
+
+Workers and threads are sized from the CPUs and memory available to the container (cgroup
+limits included). GUNICORN_PROFILE selects the worker type: 'cpu' (default) runs sync workers,
+'io' runs gthread workers, whose threads keep serving while other requests wait on SQLite locks
+or slow clients, and 'asgi' runs uvicorn workers serving asgi.py, where the inventory change feed
+holds no thread per subscriber (the Docker image uses it):
+
+    GUNICORN_PROFILE=asgi gunicorn asgi:application
+
+Every value can be overridden with the GUNICORN_* variables below, or on the command line.
+"""
+import gc
+import math
+import os
+
+# --- Resource Detection ---
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """CPUs this process may use: the affinity mask, capped by a cgroup CPU quota."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    quota = None
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')  # cgroup v2: "<quota> <period>" or "max <period>"
+    if cpu_max and not cpu_max.startswith('max'):
+        limit, period = cpu_max.split()
+        quota = int(limit) / int(period)
+    else:
+        limit, period = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def memory_limit_bytes():
+    """The cgroup memory limit, or None when there is none."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read(path)
+        # cgroup v1 reports "no limit" as a huge number
+        if value and value != 'max' and int(value) < 2 ** 60:
+            return int(value)
+    return None
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+CPUS = available_cpus()
+MEMORY_LIMIT = memory_limit_bytes()
+# Budget per worker process, used to fit the worker count into the memory limit
+WORKER_MEMORY_MB = _env_int('GUNICORN_WORKER_MEMORY_MB', 128)
+PROFILE = os.environ.get('GUNICORN_PROFILE', 'cpu')
+
+# --- Server Socket ---
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# --- Worker Processes ---
+if PROFILE == 'io':
+    worker_class = 'gthread'
+    default_workers = CPUS + 1
+    # Each thread may hold a database connection, see DB_POOL_SIZE and DB_MAX_OVERFLOW
+    threads = _env_int('GUNICORN_THREADS', 4)
+elif PROFILE == 'cpu':
+    worker_class = 'sync'
+    default_workers = 2 * CPUS + 1
+    threads = 1
+elif PROFILE == 'asgi':
+    # Each worker runs the views on its own thread pool, see ASGI_THREADS
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    default_workers = CPUS + 1
+    threads = 1
+else:
+    raise ValueError(f"Invalid GUNICORN_PROFILE '{PROFILE}'. Valid profiles: cpu, io, asgi.")
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', worker_class)
+if MEMORY_LIMIT:
+    default_workers = min(default_workers, MEMORY_LIMIT // (WORKER_MEMORY_MB * 1024 * 1024))
+workers = _env_int('GUNICORN_WORKERS', max(1, default_workers))
+
+# Restart each worker after a number of requests, so slow memory growth never accumulates.
+# The jitter keeps the workers from restarting all at once. Exiting workers flush their metrics
+# and paste cache counters (worker_exit), and the master merges them into the totals (child_exit).
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# The worker heartbeat file is touched constantly; keep it off (possibly overlay) disk storage
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# --- Preloading ---
+# Import the app (and run init_db, build the swagger spec, ...) once in the master; workers
+# share the loaded code and data copy-on-write. Turn off with --reload, which needs each
+# worker to import the code itself.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Threads started in the master do not survive fork, so the sweeper is started in post_fork
+os.environ['PASTE_SWEEPER_AUTOSTART'] = 'false'
+# Each event stream (GET /database/events) holds a thread for up to SSE_STREAM_MAX_SECONDS; keep one
+# thread per worker for other requests, so sync workers don't serve the feed. The asgi profile
+# serves it on the event loop instead, without this limit (see asgi.py).
+if PROFILE != 'asgi':
+    os.environ.setdefault('SSE_MAX_STREAMS_PER_WORKER', str(threads - 1))
+
+# --- Logging ---
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+
+
+# --- Server Hooks ---
+
+def when_ready(server):
+    server.log.info(
+        "Detected %s CPUs and a memory limit of %s; starting %s %s workers with %s threads each",
+        CPUS, f"{MEMORY_LIMIT // (1024 * 1024)} MB" if MEMORY_LIMIT else "none", workers, worker_class, threads
+    )
+    if preload_app:
+        # Move the preloaded objects out of the garbage collector's generations, so collections in
+        # the workers don't write to (and thereby copy) the pages shared with the master
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import app, paste_sweeper
+    from database import db
+
+    # The worker inherited the master's connection pool. Drop it without closing the connections,
+    # which still belong to the master, so the worker opens its own.
+    with app.app_context():
+        db.engine.dispose(close=False)
+    if app.config['PASTE_SWEEP_INTERVAL_SECONDS'] > 0:
+        paste_sweeper.start()
+
+
+def worker_exit(server, worker):
+    # Also registered with atexit, but gunicorn may end a worker without running exit handlers
+    from shared_stats import flush_all
+    flush_all()
+
+
+def child_exit(server, worker):
+    # Only the counters the master loaded with the preloaded app are known here; without
+    # preloading, the next scrape merges the exited worker's files instead
+    from shared_stats import merge_exited
+    merge_exited(worker.pid)
@@ -0,0 +1,33 @@
+"""
+This module contains the building blocks of the health and statistics endpoints of the DevOps Lab Kit API.
+
+Probes may arrive much more often than the values they report change (every few seconds from
+Docker, from each load balancer node, ...). Checks that query more than a constant amount of
+data are therefore cached per worker process for a short time.
+"""
+import threading
+import time
+
+
+class CachedValue:
+    """
+    The result of func, computed at most once per ttl seconds in this process.
+    Concurrent callers of an expired value wait for a single computation instead of each running
+    func. Exceptions are not cached, so a failing check is retried by the next caller.
+    """
+
+    def __init__(self, func, ttl):
+        self.func = func
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._computed_at = None
+
+    def get(self):
+        """Returns (value, age in seconds)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._computed_at is None or now - self._computed_at >= self.ttl:
+                self._value = self.func()
+                self._computed_at = now = time.monotonic()
+            return self._value, now - self._computed_at
@@ -0,0 +1,188 @@
+"""
+This module contains the logging configuration for the DevOps Lab Kit API.
+
+Records can be written by a background thread (LOG_ASYNC), so request threads only put them on a
+queue and never block on stdout. Formatting happens on that thread too, which is why log calls
+should pass %-style arguments instead of pre-formatted f-strings.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+
+import colorama
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# Configure colorized logging
+class ColorFormatter(logging.Formatter):
+    COLORS = {
+        'DEBUG': colorama.Fore.BLUE,
+        'INFO': colorama.Fore.WHITE,
+        'WARNING': colorama.Fore.YELLOW,
+        'ERROR': colorama.Fore.RED,
+        'CRITICAL': colorama.Fore.RED + colorama.Style.BRIGHT
+    }
+
+    def format(self, record):
+        levelname = record.levelname
+        message = super().format(record)
+        return f"{self.COLORS.get(levelname, colorama.Fore.RESET)}{message}{colorama.Style.RESET_ALL}"
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects without ANSI codes, for log collectors."""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the records below WARNING from the configured loggers
+    (and their children). rates maps logger names to the fraction to keep, e.g. {'app': 0.1}.
+    Sampling is deterministic: with a rate of 0.1, every tenth record is kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.intervals = {name: max(1, round(1 / rate)) if rate > 0 else None for name, rate in rates.items()}
+        self.counters = {name: itertools.count() for name in rates}
+
+    def _match(self, logger_name):
+        while logger_name:
+            if logger_name in self.intervals:
+                return logger_name
+            logger_name = logger_name.rpartition('.')[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        name = self._match(record.name)
+        if name is None:
+            return True
+        interval = self.intervals[name]
+        return interval is not None and next(self.counters[name]) % interval == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+    The standard handler formats every record in the calling thread before enqueueing it;
+    this one only renders exception tracebacks there, while the traceback is still available.
+    Log arguments must therefore not be mutated after the logging call.
+    """
+
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+def parse_sample_rates(value):
+    """Parses LOG_SAMPLE_RATES, e.g. 'app=0.1,werkzeug=0.5', into a dict."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+_listener = None
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener_after_fork():
+    """Gives a forked worker its own queue and listener thread (threads don't survive fork)."""
+    global _listener
+    if _listener is None:
+        return
+    queue_handler = next(h for h in logging.getLogger().handlers if isinstance(h, QueueHandler))
+    queue_handler.queue = queue.SimpleQueue()
+    _listener = QueueListener(queue_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def configure_logging(level='INFO', fmt='color', use_queue=False, sample_rates=None):
+    """
+    Configures the root logger.
+    fmt is 'color' (colorized console output), 'plain' or 'json'. With use_queue, records are
+    handed to a QueueListener thread that formats and writes them. sample_rates is passed to
+    SamplingFilter.
+    """
+    global _listener
+    formatters = {
+        'color': {'()': ColorFormatter, 'format': LOG_FORMAT, 'datefmt': DATE_FORMAT},
+        'plain': {'format': LOG_FORMAT, 'datefmt': DATE_FORMAT},
+        'json': {'()': JsonFormatter},
+    }
+    if fmt not in formatters:
+        raise ValueError(f"Invalid log format '{fmt}'. Valid formats: color, plain, json.")
+    if fmt == 'color':
+        # Initialize colorama for colored terminal output
+        colorama.init()
+
+    # Configure the Flask logger
+    dictConfig({
+        'version': 1,
+        # Keep the loggers of modules imported before logging was configured (e.g. werkzeug, sqlalchemy)
+        'disable_existing_loggers': False,
+        'formatters': {fmt: formatters[fmt]},
+        'handlers': {
+            'console': {
+                'class': 'logging.StreamHandler',
+                'formatter': fmt,
+                'level': 'DEBUG',
+            },
+        },
+        'root': {
+            'level': level,
+            'handlers': ['console'],
+        },
+    })
+    root = logging.getLogger()
+    console = root.handlers[0]
+    sampling = SamplingFilter(sample_rates or {})
+    if not use_queue:
+        console.addFilter(sampling)
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        return
+
+    # Swap the console handler for a queue; the listener thread writes to the console handler.
+    # Sampling runs before enqueueing so dropped records cost as little as possible.
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(sampling)
+    root.removeHandler(console)
+    root.addHandler(queue_handler)
+    if _listener is None:
+        atexit.register(_stop_listener)
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
+    else:
+        _listener.stop()
+    _listener = QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
@@ -0,0 +1,214 @@
+"""
+This module contains the Prometheus metrics for the DevOps Lab Kit API.
+
+Values are kept in SharedCounters stores, one file per worker process, so a scrape of /metrics
+served by any gunicorn worker reports the totals of all of them.
+"""
+import os
+import time
+
+from flask import g, request
+from sqlalchemy import event
+
+from shared_stats import SharedCounters
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds (in seconds) of the histogram buckets
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Separates the metric name, label string and suffix in store keys
+_SEP = '\x1f'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_string(labelnames, labels):
+    return ','.join(f'{name}="{_escape(labels[name])}"' for name in labelnames)
+
+
+def _sample(name, labels, value):
+    return f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base class of the metric types. Subclasses define TYPE, record values and render samples."""
+    TYPE = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.store = registry.store_for(self)
+        registry.metrics.append(self)
+
+    def _key(self, labels, suffix=''):
+        return f'{self.name}{_SEP}{_label_string(self.labelnames, labels)}{_SEP}{suffix}'
+
+    def render(self, series):
+        """Returns the exposition lines for series, a dict of {label string: {suffix: value}}."""
+        lines = []
+        for labels, values in sorted(series.items()):
+            lines.append(_sample(self.name, labels, _format_value(values.get('', 0))))
+        return lines
+
+
+class Gauge(Metric):
+    """A gauge summed over the worker processes that are currently running."""
+    TYPE = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        self.store.inc(self._key(labels), amount)
+
+    def dec(self, amount=1, **labels):
+        self.store.inc(self._key(labels), -amount)
+
+
+class Histogram(Metric):
+    """
+    Stores a count per bucket (not cumulative, so an observation updates a single bucket) plus the
+    sum and count of observed values; buckets are made cumulative when rendered.
+    """
+    TYPE = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        # Bucket, sum and count are stored as one change, so every snapshot is a valid histogram
+        increments = [(self._key(labels, 'sum'), value), (self._key(labels, 'count'), 1)]
+        for bound in self.buckets:
+            if value <= bound:
+                increments.append((self._key(labels, repr(bound)), 1))
+                break
+        self.store.inc_many(increments)
+
+    def render(self, series):
+        lines = []
+        for labels, values in sorted(series.items()):
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound in self.buckets:
+                cumulative += values.get(repr(bound), 0)
+                lines.append(_sample(f'{self.name}_bucket', f'{prefix}le="{bound}"', cumulative))
+            lines.append(_sample(f'{self.name}_bucket', f'{prefix}le="+Inf"', values.get('count', 0)))
+            lines.append(_sample(f'{self.name}_sum', labels, _format_value(values.get('sum', 0.0))))
+            lines.append(_sample(f'{self.name}_count', labels, values.get('count', 0)))
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collects the metrics of all worker processes. Histograms are kept in one store (totals survive
+    worker restarts), gauges in another that only counts live processes.
+    """
+
+    def __init__(self, directory, flush_interval=1.0, gauge_flush_interval=0.1):
+        self.metrics = []
+        self.totals = SharedCounters(os.path.join(directory, 'totals'), flush_interval)
+        # Gauges go up and down, so a stale file is more misleading than a stale total
+        self.gauges = SharedCounters(os.path.join(directory, 'gauges'), gauge_flush_interval, keep_exited=False)
+
+    def store_for(self, metric):
+        return self.gauges if isinstance(metric, Gauge) else self.totals
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        series = {}
+        for values in (self.totals.collect(), self.gauges.collect()):
+            for key, value in values.items():
+                name, labels, suffix = key.split(_SEP)
+                series.setdefault(name, {}).setdefault(labels, {})[suffix] = value
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.TYPE}')
+            lines.extend(metric.render(series.get(metric.name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+class AppMetrics:
+    """
+    Request and database metrics of the Flask app.
+    Request durations are measured until the view returns, so the time spent streaming a
+    response body (e.g. GET /database/?stream=true) is not included.
+    """
+
+    def __init__(self, directory, flush_interval=1.0):
+        self.registry = MetricsRegistry(directory, flush_interval)
+        self.request_duration = Histogram(
+            self.registry, 'http_request_duration_seconds', 'Time spent handling HTTP requests.',
+            ('endpoint', 'method', 'status'), REQUEST_BUCKETS
+        )
+        self.requests_in_flight = Gauge(
+            self.registry, 'http_requests_in_flight', 'HTTP requests currently being handled.'
+        )
+        self.query_duration = Histogram(
+            self.registry, 'db_query_duration_seconds', 'Time spent executing SQL statements.',
+            ('operation',), QUERY_BUCKETS
+        )
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def init_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    def render(self):
+        return self.registry.render()
+
+    # --- Request hooks ---
+
+    def _observe_request(self, status):
+        endpoint = request.endpoint or 'unmatched'
+        self.request_duration.observe(
+            time.perf_counter() - g._metrics_start, endpoint=endpoint, method=request.method, status=status
+        )
+        g._metrics_observed = True
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+        g._metrics_observed = False
+        self.requests_in_flight.inc()
+
+    def _after_request(self, response):
+        self._observe_request(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        if '_metrics_start' not in g:
+            # before_request never ran, e.g. an earlier before_request hook failed
+            return
+        if not g._metrics_observed:
+            # The view raised an exception, which Flask turned into a 500 response
+            self._observe_request(500)
+        self.requests_in_flight.dec()
+
+    # --- Engine events ---
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info['metrics_query_start'].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        self.query_duration.observe(time.perf_counter() - start, operation=operation)
+
+    @staticmethod
+    def _handle_error(context):
+        starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,206 @@
+"""
+This module contains the read-through cache for pastes.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+# Paste IDs are UUID hex strings; anything else is not cached so IDs can be used as file names
+CACHEABLE_ID = re.compile(r'^[0-9A-Za-z_-]{1,64}$')
+
+# Eviction frees this fraction of the limits below them, so a full cache is not scanned on every
+# store; the same fraction of max_entries stores also triggers a scan, see PasteCache._scan_due
+EVICTION_HEADROOM = 0.1
+
+
+class PasteCache:
+    """
+    Size-bounded LRU cache of stored paste content, shared by all worker processes on this host.
+    Each entry is a file named after the paste ID holding a JSON header line followed by the stored
+    (possibly gzip-compressed) bytes. Files are written atomically, so workers can read and evict
+    entries concurrently without locking. A hit refreshes the file's mtime, and eviction removes
+    the least recently used files. An entry never outlives its paste's expires_at.
+    Each process estimates the size of the cache from its last scan of the directory plus its own
+    stores and removals, and only scans (and evicts) when the estimate exceeds a limit or after
+    a number of stores, which picks up the entries of the other workers. Between scans the
+    limits can be exceeded by what the other workers stored since their last scan.
+    """
+
+    def __init__(self, directory, counters, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 max_entry_bytes=1024 * 1024, ttl=3600):
+        self.directory = directory
+        self.counters = counters
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        # (entries, bytes) as of the last scan plus this process's changes since, None before the first scan
+        self._estimate = None
+        self._stores_since_scan = 0
+        self._scan_interval = max(1, int(max_entries * EVICTION_HEADROOM))
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _path(self, paste_id):
+        if not CACHEABLE_ID.match(paste_id):
+            return None
+        return os.path.join(self.directory, paste_id)
+
+    def get(self, paste_id):
+        """
+        Returns a tuple of (content_type, codec, data, expires_at, digest) for a cached paste, or None.
+        expires_at is the paste's expiry as a Unix timestamp, digest the SHA-256 of its content.
+        """
+        path = self._path(paste_id)
+        if not self.enabled or path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                data = f.read()
+            entry = header['content_type'], header['codec'], data, header['expires_at'], header['digest']
+        except (OSError, ValueError, KeyError):
+            # Missing, or written in an older format
+            self.counters.inc('misses')
+            return None
+        if header['cache_expires_at'] <= time.time():
+            self._remove(path, 'expirations')
+            self.counters.inc('misses')
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        self.counters.inc('hits')
+        return entry
+
+    def put(self, paste_id, content_type, codec, data, expires_at, digest):
+        """Caches stored paste content until the cache TTL or the paste's expires_at, whichever is first."""
+        path = self._path(paste_id)
+        if not self.enabled or path is None or len(data) > self.max_entry_bytes:
+            return
+        header = {
+            'content_type': content_type,
+            'codec': codec,
+            'expires_at': expires_at,
+            'digest': digest,
+            'cache_expires_at': min(time.time() + self.ttl, expires_at),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.counters.inc('stores')
+        with self._lock:
+            if self._estimate is not None:
+                # Replacing an existing entry overestimates the cache, which only brings the next scan forward
+                entries, total_bytes = self._estimate
+                self._estimate = entries + 1, total_bytes + os.path.getsize(path)
+            self._stores_since_scan += 1
+            scan = self._scan_due()
+        if scan:
+            self._evict()
+
+    def invalidate(self, paste_ids):
+        """Removes the given pastes from the cache."""
+        for paste_id in paste_ids:
+            path = self._path(paste_id)
+            if path is not None:
+                self._remove(path, 'invalidations')
+
+    def _remove(self, path, counter):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._estimate is not None:
+                entries, total_bytes = self._estimate
+                self._estimate = max(0, entries - 1), max(0, total_bytes - size)
+        self.counters.inc(counter)
+
+    def _scan_due(self):
+        """Whether the directory should be scanned after a store. Needs self._lock."""
+        if self._estimate is None or self._stores_since_scan >= self._scan_interval:
+            return True
+        entries, total_bytes = self._estimate
+        return entries > self.max_entries or total_bytes > self.max_bytes
+
+    def _scan(self):
+        """Returns (mtime, size, path) of every entry in the cache directory."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        """
+        Scans the cache and, when it exceeds its size limits, removes the least recently used
+        entries until it is EVICTION_HEADROOM below them.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return  # Another thread of this process is already scanning
+        try:
+            entries = self._scan()
+            count, total_bytes = len(entries), sum(size for _, size, _ in entries)
+            if count > self.max_entries or total_bytes > self.max_bytes:
+                max_entries = int(self.max_entries * (1 - EVICTION_HEADROOM))
+                max_bytes = int(self.max_bytes * (1 - EVICTION_HEADROOM))
+                entries.sort()
+                for _, size, path in entries:
+                    if count <= max_entries and total_bytes <= max_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass  # Removed by another worker meanwhile
+                    else:
+                        self.counters.inc('evictions')
+                    count -= 1
+                    total_bytes -= size
+            with self._lock:
+                self._estimate = count, total_bytes
+                self._stores_since_scan = 0
+        finally:
+            self._evict_lock.release()
+
+    def stats(self):
+        """
+        Returns the cache counters summed over all workers, plus this process's estimate of the
+        number of entries (see the class docstring); only the first call of a process scans.
+        """
+        counters = self.counters.collect()
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        with self._lock:
+            estimate = self._estimate
+        if estimate is None:
+            self._evict()
+            with self._lock:
+                estimate = self._estimate
+        return {
+            "entries": estimate[0] if estimate else 0,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+            "stores": counters.get('stores', 0),
+            "evictions": counters.get('evictions', 0),
+            "expirations": counters.get('expirations', 0),
+            "invalidations": counters.get('invalidations', 0)
+        }
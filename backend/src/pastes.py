@@ -0,0 +1,228 @@
+"""
+This module contains the storage layer for pastes.
+Paste bodies are deduplicated: each distinct body is stored once in the paste_blob table,
+keyed by its SHA-256 digest and reference-counted, and every paste is a lightweight row
+pointing at a blob with its own expiry.
+"""
+import codecs
+import hashlib
+import tempfile
+import zlib
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import db, Pastebin, PasteBlob, encode_paste_content, decode_paste_content, get_row_counts
+
+# Streamed uploads larger than this are spooled to a temporary file instead of memory
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+
+class PasteTooLarge(Exception):
+    """Raised when paste content exceeds the configured maximum size."""
+
+
+def reference_blob(digest, raw, min_size=256, level=6):
+    """
+    Adds a reference to the blob with the given digest, creating it from raw if it doesn't exist.
+    Content that is already stored is neither compressed nor written again.
+    """
+    result = db.session.execute(
+        update(PasteBlob).where(PasteBlob.digest == digest).values(refcount=PasteBlob.refcount + 1)
+    )
+    if result.rowcount:
+        return
+    codec, data = encode_paste_content(raw, min_size, level)
+    # Another worker may have stored the same content in the meantime
+    db.session.execute(
+        sqlite_insert(PasteBlob)
+        .values(digest=digest, codec=codec, data=data, size=len(raw), stored_size=len(data), refcount=1)
+        .on_conflict_do_update(index_elements=[PasteBlob.digest], set_={'refcount': PasteBlob.refcount + 1})
+    )
+
+
+def store_paste(paste_id, text, content_type, expires_at, min_size=256, level=6):
+    """Stores a new paste pointing at the (possibly shared) blob for its content. The caller commits."""
+    raw = text.encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()
+    reference_blob(digest, raw, min_size, level)
+    paste = Pastebin(id=paste_id, blob_digest=digest, expires_at=expires_at, content_type=content_type)
+    db.session.add(paste)
+    return paste
+
+
+def _driver_connection():
+    """Returns the raw sqlite3 connection of the current session's transaction."""
+    return db.session.connection().connection.driver_connection
+
+
+def _blob_rowid(digest):
+    return db.session.scalar(text("SELECT rowid FROM paste_blob WHERE digest = :digest"), {'digest': digest})
+
+
+def store_paste_stream(paste_id, stream, content_type, expires_at, max_size, chunk_size=64 * 1024,
+                       min_size=256, level=6):
+    """
+    Stores a new paste read from a file-like stream without holding the whole body in memory.
+    The body is hashed, UTF-8 validated and gzip-compressed chunk by chunk into spooled temporary
+    files, then copied into the blob with SQLite incremental blob I/O. Like store_paste, the body is
+    stored uncompressed when compression doesn't save space. Raises PasteTooLarge when the body
+    exceeds max_size, and UnicodeDecodeError when it is not valid UTF-8. The caller commits.
+    """
+    digest = hashlib.sha256()
+    validator = codecs.getincrementaldecoder('utf-8')()
+    # wbits=31 writes a gzip container, so the stored bytes can be served with Content-Encoding: gzip
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as raw_spool, \
+            tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as gzip_spool:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise PasteTooLarge(f"Paste exceeds the maximum size of {max_size} bytes")
+            digest.update(chunk)
+            validator.decode(chunk)
+            raw_spool.write(chunk)
+            gzip_spool.write(compressor.compress(chunk))
+        validator.decode(b'', final=True)
+        gzip_spool.write(compressor.flush())
+
+        digest = digest.hexdigest()
+        if size < min_size:
+            raw_spool.seek(0)
+            reference_blob(digest, raw_spool.read(), min_size, level)
+        else:
+            if gzip_spool.tell() < size:
+                codec, spool = 'gzip', gzip_spool
+            else:
+                codec, spool = 'identity', raw_spool
+            stored_size = spool.tell()
+            # Returns refcount 1 only if this call created the blob and still needs to write its content
+            refcount = db.session.scalar(
+                sqlite_insert(PasteBlob)
+                .values(digest=digest, codec=codec, data=func.zeroblob(stored_size), size=size,
+                        stored_size=stored_size, refcount=1)
+                .on_conflict_do_update(index_elements=[PasteBlob.digest], set_={'refcount': PasteBlob.refcount + 1})
+                .returning(PasteBlob.refcount)
+            )
+            if refcount == 1:
+                spool.seek(0)
+                connection = _driver_connection()
+                with connection.blobopen('paste_blob', 'data', _blob_rowid(digest)) as blob:
+                    while chunk := spool.read(chunk_size):
+                        blob.write(chunk)
+
+    paste = Pastebin(id=paste_id, blob_digest=digest, expires_at=expires_at, content_type=content_type)
+    db.session.add(paste)
+    return paste
+
+
+def _iter_blob(digest, stored_size, chunk_size):
+    """Yields the stored bytes of a blob in chunks using SQLite incremental blob I/O."""
+    connection = _driver_connection()
+    with connection.blobopen('paste_blob', 'data', _blob_rowid(digest), readonly=True) as blob:
+        for _ in range(0, stored_size, chunk_size):
+            yield blob.read(chunk_size)
+
+
+def _gunzip_chunks(chunks, chunk_size):
+    """Decompresses gzip chunks, yielding at most chunk_size bytes at a time."""
+    decompressor = zlib.decompressobj(31)
+    for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk, chunk_size)
+            if data:
+                yield data
+            chunk = decompressor.unconsumed_tail
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+def paste_metadata(paste_id):
+    """
+    Returns the metadata of a paste as a row of (id, content_type, expires_at, blob_digest, codec,
+    size, stored_size), or None if there is no such paste. A single Core query joins the blob, and
+    neither content nor ORM objects are loaded. The blob columns are None for pastes stored by
+    earlier versions.
+    """
+    return db.session.execute(
+        select(Pastebin.id, Pastebin.content_type, Pastebin.expires_at, Pastebin.blob_digest,
+               PasteBlob.codec, PasteBlob.size, PasteBlob.stored_size)
+        .outerjoin(PasteBlob, PasteBlob.digest == Pastebin.blob_digest)
+        .where(Pastebin.id == paste_id)
+    ).one_or_none()
+
+
+def stored_metadata(meta):
+    """
+    Returns a tuple of (digest, codec, stored_size) for the paste_metadata() row of a paste.
+    digest is the SHA-256 of the paste's UTF-8 content and serves as its ETag.
+    """
+    if meta.blob_digest is not None:
+        return meta.blob_digest, meta.codec, meta.stored_size
+    # Pastes stored by earlier versions are small and have no digest yet
+    codec, data = stored_content(meta)
+    digest = hashlib.sha256(decode_paste_content(codec, data)).hexdigest()
+    return digest, codec, len(data)
+
+
+def stored_content(meta):
+    """Returns a tuple of (codec, data) with the content of a paste as stored."""
+    if meta.blob_digest is not None:
+        return meta.codec, db.session.scalar(select(PasteBlob.data).where(PasteBlob.digest == meta.blob_digest))
+    return db.session.get(Pastebin, meta.id).stored_content()
+
+
+def paste_body(meta, accept_gzip, chunk_size=64 * 1024):
+    """
+    Returns a tuple of (chunks, content_encoding, content_length) for sending the paste of a
+    paste_metadata() row. Blob-backed content is read in chunks straight from SQLite, so memory per
+    request stays bounded by chunk_size. gzip content is passed through when the client accepts
+    it, and otherwise decompressed chunk by chunk. The iterator needs the application context
+    while it is consumed.
+    """
+    if meta.blob_digest is None:
+        # Pastes stored by earlier versions are small enough to be held in memory
+        codec, data = stored_content(meta)
+        if codec == 'gzip' and accept_gzip:
+            return iter([data]), 'gzip', len(data)
+        data = decode_paste_content(codec, data)
+        return iter([data]), None, len(data)
+
+    chunks = _iter_blob(meta.blob_digest, meta.stored_size, chunk_size)
+    if meta.codec == 'gzip':
+        if accept_gzip:
+            return chunks, 'gzip', meta.stored_size
+        return _gunzip_chunks(chunks, chunk_size), None, meta.size
+    return chunks, None, meta.stored_size
+
+
+def dedup_stats():
+    """Returns paste and blob counts together with the deduplication and compression ratios."""
+    # Maintained by triggers, so counting the pastes never scans the table
+    pastes = get_row_counts()['pastebin']
+    blobs, references, logical_bytes, unique_bytes, stored_bytes = db.session.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(PasteBlob.refcount), 0),
+            func.coalesce(func.sum(PasteBlob.size * PasteBlob.refcount), 0),
+            func.coalesce(func.sum(PasteBlob.size), 0),
+            func.coalesce(func.sum(PasteBlob.stored_size), 0),
+        )
+    ).one()
+    return {
+        "pastes": pastes,
+        "blob_references": references,
+        "unique_blobs": blobs,
+        "logical_bytes": logical_bytes,
+        "unique_bytes": unique_bytes,
+        "stored_bytes": stored_bytes,
+        # Logical size of all blob-backed pastes relative to their distinct content
+        "dedup_ratio": round(logical_bytes / unique_bytes, 2) if unique_bytes else None,
+        "compression_ratio": round(unique_bytes / stored_bytes, 2) if stored_bytes else None,
+        "total_ratio": round(logical_bytes / stored_bytes, 2) if stored_bytes else None
+    }
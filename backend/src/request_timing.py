@@ -0,0 +1,151 @@
+"""
+This module contains the per-request timing of the DevOps Lab Kit API.
+
+Time spent executing SQL statements and serializing JSON is added up for each request and
+reported in the Server-Timing and X-Query-Count response headers. Requests slower than a
+threshold are logged together with the SQL statements they executed.
+"""
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import JSONProvider
+from sqlalchemy import event
+
+
+class RequestStats:
+    """Timings collected while handling one request. Durations are in seconds."""
+
+    def __init__(self, record_statements):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.serialize = 0.0
+        self.query_count = 0
+        # Set while serializing, so that nested dumps calls are only counted once
+        self.serializing = False
+        # (statement, duration) of every query, only kept when slow requests are logged
+        self.statements = [] if record_statements else None
+
+
+def _current_stats():
+    if has_request_context():
+        return g.get('_request_stats')
+    return None
+
+
+class TimingJSONProvider(JSONProvider):
+    """
+    Wraps the app's JSON provider, whichever it is, adding the time spent serializing to the
+    current request. Attributes not defined here (e.g. sort_keys, or dumps_bytes of the
+    FastJSONProvider) are those of the wrapped provider.
+    """
+
+    def __init__(self, app, provider):
+        super().__init__(app)
+        self.provider = provider
+
+    def __getattr__(self, name):
+        # Only called for attributes this class does not define
+        if name == 'provider':
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    def dumps(self, obj, **kwargs):
+        return self._timed(self.provider.dumps, obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return self.provider.loads(s, **kwargs)
+
+    def dumps_bytes(self, obj):
+        return self._timed(self.provider.dumps_bytes, obj)
+
+    def response(self, *args, **kwargs):
+        # The wrapped provider serializes with its own methods, so the whole call is timed
+        return self._timed(self.provider.response, *args, **kwargs)
+
+    @staticmethod
+    def _timed(serialize, *args, **kwargs):
+        stats = _current_stats()
+        if stats is None or stats.serializing:
+            return serialize(*args, **kwargs)
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return serialize(*args, **kwargs)
+        finally:
+            stats.serialize += time.perf_counter() - start
+            stats.serializing = False
+
+
+class RequestTiming:
+    """
+    Adds Server-Timing (db, serialize and total, in milliseconds) and X-Query-Count headers to
+    every response. With slow_request_ms > 0, requests that take at least that long are logged
+    with their SQL statements. Timings end when the view returns, so a streamed body is not included.
+    """
+
+    def __init__(self, headers=True, slow_request_ms=0):
+        self.headers = headers
+        self.slow_request_ms = slow_request_ms
+
+    def init_app(self, app):
+        """Registers the request hooks and wraps the JSON provider the app is configured with."""
+        app.json = TimingJSONProvider(app, app.json)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def init_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    # --- Request hooks ---
+
+    def _before_request(self):
+        g._request_stats = RequestStats(record_statements=self.slow_request_ms > 0)
+
+    def _after_request(self, response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - stats.start) * 1000
+        if self.headers:
+            response.headers['Server-Timing'] = (
+                f"db;dur={stats.db * 1000:.2f}, serialize;dur={stats.serialize * 1000:.2f}, total;dur={total_ms:.2f}"
+            )
+            response.headers['X-Query-Count'] = str(stats.query_count)
+        if 0 < self.slow_request_ms <= total_ms:
+            self._log_slow_request(stats, total_ms, response.status_code)
+        return response
+
+    def _log_slow_request(self, stats, total_ms, status):
+        statements = '\n'.join(
+            f"  {duration * 1000:8.2f} ms  {' '.join(statement.split())}" for statement, duration in stats.statements
+        )
+        current_app.logger.warning(
+            "Slow request %s %s -> %s took %.1f ms (db %.1f ms in %s queries, serialize %.1f ms)%s%s",
+            request.method, request.full_path.rstrip('?'), status, total_ms, stats.db * 1000,
+            stats.query_count, stats.serialize * 1000, ':\n' if statements else '', statements
+        )
+
+    # --- Engine events ---
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('timing_query_start', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['timing_query_start'].pop()
+        stats = _current_stats()
+        if stats is None:
+            return
+        stats.db += duration
+        stats.query_count += 1
+        if stats.statements is not None:
+            stats.statements.append((statement, duration))
+
+    @staticmethod
+    def _handle_error(context):
+        starts = context.connection.info.get('timing_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,219 @@
+"""
+This module contains counters that are shared between gunicorn worker processes.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where merges are not serialized between processes
+    fcntl = None
+
+# File holding the merged totals of exited processes
+AGGREGATE_FILE = 'aggregate.json'
+
+_instances = weakref.WeakSet()
+
+
+class SharedCounters:
+    """
+    Counters summed across all worker processes without any locking between them.
+    Each process keeps its counters in memory and writes them to its own file
+    (<directory>/<pid>.json) at most every flush_interval seconds; changes made in between are
+    written by a timer thread, so an idle worker's file is never left stale, and by flush_all()
+    when the process exits. Reading sums the files of every process.
+    With keep_exited, the file of an exited process is merged into <directory>/aggregate.json,
+    so totals survive worker restarts (and a new process reusing its pid); otherwise it is
+    removed, for values that describe current state (e.g. requests in flight).
+    """
+
+    def __init__(self, directory, flush_interval=1.0, keep_exited=True):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.keep_exited = keep_exited
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reset()
+        # The flush timer thread may hold the locks at the moment a preloading master forks
+        os.register_at_fork(after_in_child=self._reset_after_fork)
+        _instances.add(self)
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._values = {}
+        self._dirty = False
+        self._written = False
+        self._last_flush = 0.0
+        self._timer = None
+
+    def _check_fork(self):
+        # A forked worker inherits the parent's in-memory counters, which the parent already reported
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, amount=1):
+        self.inc_many(((name, amount),))
+
+    def inc_many(self, increments):
+        """
+        Applies several (name, amount) increments as one change: a written snapshot contains
+        either all of them or none.
+        """
+        with self._lock:
+            self._check_fork()
+            for name, amount in increments:
+                self._values[name] = self._values.get(name, 0) + amount
+            self._dirty = True
+            remaining = self.flush_interval - (time.monotonic() - self._last_flush)
+            if 0 < remaining and self._timer is None:
+                self._timer = threading.Timer(remaining, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if remaining <= 0:
+            self.flush()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self):
+        """Writes this process's counters to its file if they changed."""
+        # Snapshots are written one at a time, so an older one never replaces a newer one
+        with self._write_lock:
+            with self._lock:
+                self._check_fork()
+                if not self._dirty:
+                    return
+                snapshot = dict(self._values)
+                self._dirty = False
+                self._last_flush = time.monotonic()
+            if not self._written:
+                # A file with our pid was left by an exited process that had the same pid
+                with self._merge_lock():
+                    self._release(self._pid)
+                self._written = True
+            self._write(f'{self._pid}.json', snapshot)
+
+    def collect(self):
+        """Returns the counters summed over all processes, after merging or removing the files of exited ones."""
+        self.flush()
+        totals = {}
+        with self._merge_lock():
+            for pid in self._pids():
+                if pid != os.getpid() and not _process_alive(pid):
+                    self._release(pid)
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.json'):
+                    continue
+                for name, value in self._read(entry.path).items():
+                    totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def merge_exited(self, pid):
+        """Merges (or removes) the file of the exited process pid."""
+        with self._merge_lock():
+            self._release(pid)
+
+    # --- Files ---
+
+    def _pids(self):
+        return [int(entry.name[:-len('.json')]) for entry in os.scandir(self.directory)
+                if entry.name.endswith('.json') and entry.name[:-len('.json')].isdigit()]
+
+    def _release(self, pid):
+        """Merges the file of pid into the aggregate (with keep_exited) and removes it. Needs the merge lock."""
+        path = os.path.join(self.directory, f'{pid}.json')
+        if not os.path.exists(path):
+            return
+        if self.keep_exited:
+            values = self._read(path)
+            aggregate = self._read(os.path.join(self.directory, AGGREGATE_FILE))
+            for name, value in values.items():
+                aggregate[name] = aggregate.get(name, 0) + value
+            self._write(AGGREGATE_FILE, aggregate)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _merge_lock(self):
+        return _FileLock(os.path.join(self.directory, '.lock'))
+
+    def _write(self, name, values):
+        # Write to a temporary file first so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(values, f)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+class _FileLock:
+    """An exclusive lock on a file, held between the processes sharing a counters directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            self._file.close()  # Releases the lock
+            self._file = None
+
+
+def flush_all():
+    """
+    Writes the pending changes of every SharedCounters of this process; runs at exit.
+    Counters whose directory was removed in the meantime (e.g. a temporary one) are skipped.
+    """
+    for counters in list(_instances):
+        try:
+            counters.flush()
+        except FileNotFoundError:
+            if os.path.isdir(counters.directory):
+                raise
+
+
+def merge_exited(pid):
+    """Merges the files of an exited worker process into the aggregates, e.g. from gunicorn's child_exit hook."""
+    for counters in list(_instances):
+        counters.merge_exited(pid)
+
+
+atexit.register(flush_all)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
@@ -0,0 +1,62 @@
+"""
+This module contains the registry of precomputed responses for endpoints whose output never changes
+while the application is running.
+"""
+import gzip
+import hashlib
+
+from flask import request
+
+
+class StaticResponse:
+    """A response body serialized once, with its gzip variant and ETags precomputed."""
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        # Tiny bodies grow when compressed, so they are always sent as-is
+        self.gzip_body = compressed if len(compressed) < len(body) else None
+        self.gzip_etag = f"{self.etag}-gzip"
+
+
+class StaticResponseRegistry:
+    """
+    Serves registered responses without any per-request serialization.
+    Bodies are built at startup; each request only picks the gzip or identity variant
+    and answers If-None-Match with 304.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._responses = {}
+
+    def add(self, name, body, mimetype):
+        """Registers a text or bytes body under the given name."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self._responses[name] = StaticResponse(body, mimetype)
+
+    def add_json(self, name, data):
+        """Registers data serialized exactly as jsonify would serialize it."""
+        response = self.app.json.response(data)
+        self._responses[name] = StaticResponse(response.get_data(), response.mimetype)
+
+    def serve(self, name):
+        """Returns the response registered under name for the current request."""
+        static = self._responses[name]
+        use_gzip = static.gzip_body is not None and bool(request.accept_encodings['gzip'])
+        etag = static.gzip_etag if use_gzip else static.etag
+
+        if request.if_none_match.contains_weak(etag):
+            response = self.app.response_class(status=304)
+        else:
+            response = self.app.response_class(static.gzip_body if use_gzip else static.body, mimetype=static.mimetype)
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        if static.gzip_body is not None:
+            response.vary.add('Accept-Encoding')
+        return response
@@ -21,12 +21,93 @@ swagger_config = {
     "paths": {
         "/database/": {
             "get": {
-                "summary": "Get all inventory items",
-                "description": "Returns a list of all inventory items in the database",
+                "summary": "Get inventory items",
+                "description": "Returns inventory items ordered by ID. Without parameters all items are returned; use limit/after_id for keyset pagination or stream=1 to stream the full list. Requests with q, a range filter, sort or cursor are always paginated",
                 "produces": ["application/json"],
+                "parameters": [
+                    {
+                        "in": "query",
+                        "name": "limit",
+                        "type": "integer",
+                        "required": False,
+                        "minimum": 1,
+                        "description": "Maximum number of items to return"
+                    },
+                    {
+                        "in": "query",
+                        "name": "after_id",
+                        "type": "integer",
+                        "required": False,
+                        "description": "Cursor: only return items with an ID greater than this value"
+                    },
+                    {
+                        "in": "query",
+                        "name": "stream",
+                        "type": "integer",
+                        "required": False,
+                        "description": "Set to 1 to stream every matching item as a JSON array from a server-side cursor. Can't be combined with limit"
+                    },
+                    {
+                        "in": "query",
+                        "name": "q",
+                        "type": "string",
+                        "required": False,
+                        "description": "Full-text name search: items whose name contains all of these words, the last one as a prefix"
+                    },
+                    {
+                        "in": "query",
+                        "name": "min_quantity",
+                        "type": "integer",
+                        "required": False,
+                        "description": "Only return items with at least this quantity"
+                    },
+                    {
+                        "in": "query",
+                        "name": "max_quantity",
+                        "type": "integer",
+                        "required": False,
+                        "description": "Only return items with at most this quantity"
+                    },
+                    {
+                        "in": "query",
+                        "name": "min_price",
+                        "type": "number",
+                        "required": False,
+                        "description": "Only return items with at least this price"
+                    },
+                    {
+                        "in": "query",
+                        "name": "max_price",
+                        "type": "number",
+                        "required": False,
+                        "description": "Only return items with at most this price"
+                    },
+                    {
+                        "in": "query",
+                        "name": "sort",
+                        "type": "string",
+                        "enum": ["id", "-id", "name", "-name", "quantity", "-quantity", "price", "-price"],
+                        "required": False,
+                        "description": "Sort order; a leading '-' sorts in descending order. Ties are ordered by ID"
+                    },
+                    {
+                        "in": "query",
+                        "name": "cursor",
+                        "type": "string",
+                        "required": False,
+                        "description": "Cursor of a sorted request: the X-Next-Cursor of the previous page"
+                    },
+                    {
+                        "in": "header",
+                        "name": "If-None-Match",
+                        "type": "string",
+                        "required": False,
+                        "description": "ETag of a previously fetched response; 304 is returned if the inventory has not changed"
+                    }
+                ],
                 "responses": {
                     "200": {
-                        "description": "List of inventory items",
+                        "description": "List of inventory items. Paginated responses include a Link header (rel=\"next\") and an X-Next-Cursor header when more items are available",
                         "schema": {
                             "type": "array",
                             "items": {
@@ -34,6 +115,12 @@ swagger_config = {
                             }
                         }
                     },
+                    "304": {
+                        "description": "Inventory not modified since the ETag given in If-None-Match"
+                    },
+                    "400": {
+                        "description": "Invalid pagination, search or sort parameters"
+                    },
                     "500": {
                         "description": "Server error"
                     }
@@ -73,6 +160,135 @@ swagger_config = {
                 "tags": ["Inventory"]
             }
         },
+        "/database/stats": {
+            "get": {
+                "summary": "Inventory statistics",
+                "description": "Returns the item count, total quantity, total value (sum of quantity * price), the number of items with a quantity below INVENTORY_LOW_STOCK_THRESHOLD and a histogram of prices over INVENTORY_PRICE_BUCKETS. Read from a summary that database triggers keep current, so the cost does not depend on the inventory size",
+                "produces": ["application/json"],
+                "parameters": [
+                    {
+                        "in": "header",
+                        "name": "If-None-Match",
+                        "type": "string",
+                        "required": False,
+                        "description": "ETag of a previously fetched response; 304 is returned if the inventory has not changed"
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Inventory statistics",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "item_count": {"type": "integer"},
+                                "total_quantity": {"type": "integer"},
+                                "total_value": {"type": "number"},
+                                "low_stock_threshold": {"type": "integer"},
+                                "low_stock_count": {"type": "integer"},
+                                "price_buckets": {
+                                    "type": "array",
+                                    "description": "Items per price range, from min (inclusive) to max (exclusive); null bounds are open",
+                                    "items": {
+                                        "type": "object",
+                                        "properties": {
+                                            "min": {"type": "number"},
+                                            "max": {"type": "number"},
+                                            "item_count": {"type": "integer"},
+                                            "total_quantity": {"type": "integer"}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "304": {
+                        "description": "Inventory not modified since the ETag given in If-None-Match"
+                    },
+                    "503": {
+                        "description": "The inventory summary has not been built yet"
+                    },
+                    "500": {
+                        "description": "Server error"
+                    }
+                },
+                "tags": ["Inventory"]
+            }
+        },
+        "/database/events": {
+            "get": {
+                "summary": "Inventory change feed",
+                "description": "Streams every create, update and delete of an inventory item as Server-Sent Events (text/event-stream). The event type is create, update or delete; the data is the item as JSON (only its id for deletes) and the event id identifies the change. Reconnecting clients send Last-Event-ID to resume; when the changes they missed are no longer retained, a reset event tells them to reload the inventory. New clients only receive changes made after they connect",
+                "produces": ["text/event-stream"],
+                "parameters": [
+                    {
+                        "in": "header",
+                        "name": "Last-Event-ID",
+                        "type": "integer",
+                        "required": False,
+                        "description": "ID of the last event received; the stream resumes after it"
+                    },
+                    {
+                        "in": "query",
+                        "name": "last_event_id",
+                        "type": "integer",
+                        "required": False,
+                        "description": "Same as the Last-Event-ID header, for the first connection of an EventSource"
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Event stream"
+                    },
+                    "400": {
+                        "description": "Invalid Last-Event-ID"
+                    },
+                    "503": {
+                        "description": "Too many event streams in this worker (gunicorn only); see the Retry-After header"
+                    }
+                },
+                "tags": ["Inventory"]
+            }
+        },
+        "/database/batch": {
+            "post": {
+                "summary": "Apply a batch of inventory operations",
+                "description": "Applies create, update and delete operations in a single transaction. Accepts a JSON array or NDJSON (Content-Type: application/x-ndjson). Creates are applied first, then updates, then deletes",
+                "consumes": ["application/json", "application/x-ndjson"],
+                "produces": ["application/json"],
+                "parameters": [
+                    {
+                        "in": "body",
+                        "name": "operations",
+                        "description": "Operations to apply",
+                        "required": True,
+                        "schema": {
+                            "type": "array",
+                            "items": {
+                                "$ref": "#/definitions/BatchOperation"
+                            }
+                        }
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Per-operation results, in request order",
+                        "schema": {
+                            "$ref": "#/definitions/BatchOutput"
+                        }
+                    },
+                    "400": {
+                        "description": "Invalid input"
+                    },
+                    "413": {
+                        "description": "Too many operations"
+                    },
+                    "500": {
+                        "description": "Server error, no changes were made"
+                    }
+                },
+                "tags": ["Inventory"]
+            }
+        },
         "/database/{item_id}": {
             "parameters": [
                 {
@@ -85,7 +301,7 @@ swagger_config = {
             ],
             "put": {
                 "summary": "Update an inventory item",
-                "description": "Updates an existing inventory item in the database",
+                "description": "Updates the given fields of an existing inventory item in a single statement and increments its version. The response carries the new version as ETag",
                 "consumes": ["application/json"],
                 "produces": ["application/json"],
                 "parameters": [
@@ -97,6 +313,13 @@ swagger_config = {
                         "schema": {
                             "$ref": "#/definitions/InventoryUpdate"
                         }
+                    },
+                    {
+                        "in": "header",
+                        "name": "If-Match",
+                        "type": "string",
+                        "required": False,
+                        "description": "The item's version as ETag, e.g. \"3\"; the request fails with 412 if the item has changed since. Required when INVENTORY_REQUIRE_IF_MATCH is set"
                     }
                 ],
                 "responses": {
@@ -112,6 +335,63 @@ swagger_config = {
                     "404": {
                         "description": "Item not found"
                     },
+                    "412": {
+                        "description": "The item's version does not match If-Match; the body contains the current item"
+                    },
+                    "428": {
+                        "description": "If-Match is required (INVENTORY_REQUIRE_IF_MATCH)"
+                    },
+                    "500": {
+                        "description": "Server error"
+                    }
+                },
+                "tags": ["Inventory"]
+            },
+            "patch": {
+                "summary": "Adjust the quantity of an inventory item",
+                "description": "Adds quantity_delta to the quantity in one atomic UPDATE, so concurrent adjustments never overwrite each other. Optional bounds reject adjustments that would leave the quantity outside them",
+                "consumes": ["application/json"],
+                "produces": ["application/json"],
+                "parameters": [
+                    {
+                        "in": "body",
+                        "name": "adjustment",
+                        "description": "Quantity adjustment",
+                        "required": True,
+                        "schema": {
+                            "$ref": "#/definitions/InventoryAdjustment"
+                        }
+                    },
+                    {
+                        "in": "header",
+                        "name": "If-Match",
+                        "type": "string",
+                        "required": False,
+                        "description": "The item's version as ETag, e.g. \"3\"; the request fails with 412 if the item has changed since. Required when INVENTORY_REQUIRE_IF_MATCH is set"
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Item adjusted successfully",
+                        "schema": {
+                            "$ref": "#/definitions/Inventory"
+                        }
+                    },
+                    "400": {
+                        "description": "Invalid input"
+                    },
+                    "404": {
+                        "description": "Item not found"
+                    },
+                    "409": {
+                        "description": "The quantity would be outside min_quantity/max_quantity; the body contains the current item"
+                    },
+                    "412": {
+                        "description": "The item's version does not match If-Match; the body contains the current item"
+                    },
+                    "428": {
+                        "description": "If-Match is required (INVENTORY_REQUIRE_IF_MATCH)"
+                    },
                     "500": {
                         "description": "Server error"
                     }
@@ -139,7 +419,7 @@ swagger_config = {
         "/healthcheck": {
             "get": {
                 "summary": "Health check",
-                "description": "Checks the health of the application, including database connectivity and table access",
+                "description": "Checks the health of the application, including database connectivity and the schema version, and returns the table row counts of /stats. Prefer /livez and /readyz for probes",
                 "produces": ["application/json"],
                 "responses": {
                     "200": {
@@ -152,6 +432,72 @@ swagger_config = {
                 "tags": ["System"]
             }
         },
+        "/livez": {
+            "get": {
+                "summary": "Liveness probe",
+                "description": "Reports that the process is serving requests. Never touches the database",
+                "produces": ["application/json"],
+                "responses": {
+                    "200": {
+                        "description": "The process is alive"
+                    }
+                },
+                "tags": ["System"]
+            }
+        },
+        "/readyz": {
+            "get": {
+                "summary": "Readiness probe",
+                "description": "Runs SELECT 1 against the database and checks that its schema is at the version the application expects. The schema check is cached for HEALTH_CACHE_TTL_SECONDS",
+                "produces": ["application/json"],
+                "responses": {
+                    "200": {
+                        "description": "The application is ready to serve requests"
+                    },
+                    "503": {
+                        "description": "The database is unreachable or its schema is outdated"
+                    }
+                },
+                "tags": ["System"]
+            }
+        },
+        "/stats": {
+            "get": {
+                "summary": "Table statistics",
+                "description": "Returns the number of inventory items and pastes from counters maintained by database triggers, cached for HEALTH_CACHE_TTL_SECONDS",
+                "produces": ["application/json"],
+                "responses": {
+                    "200": {
+                        "description": "Row counts and the age of the cached values in seconds",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "inventory_count": {"type": "integer"},
+                                "pastebin_count": {"type": "integer"},
+                                "age_seconds": {"type": "number"}
+                            }
+                        }
+                    },
+                    "500": {
+                        "description": "Failed to fetch table statistics"
+                    }
+                },
+                "tags": ["System"]
+            }
+        },
+        "/metrics": {
+            "get": {
+                "summary": "Prometheus metrics",
+                "description": "Returns request duration histograms per endpoint and status code, requests in flight and SQL query duration histograms, aggregated over all worker processes",
+                "produces": ["text/plain"],
+                "responses": {
+                    "200": {
+                        "description": "Metrics in the Prometheus text exposition format"
+                    }
+                },
+                "tags": ["System"]
+            }
+        },
         "/environment": {
             "get": {
                 "summary": "Get environment variables",
@@ -253,6 +599,44 @@ swagger_config = {
                     }
                 },
                 "tags": ["Pastebin"]
+            },
+            "put": {
+                "summary": "Stream raw text into pastebin",
+                "description": "Stores the raw request body (any text/* content type) with a 24h auto-delete policy. The body is streamed into storage in chunks, so large pastes are not buffered in memory",
+                "consumes": ["text/plain"],
+                "produces": ["application/json"],
+                "parameters": [
+                    {
+                        "in": "body",
+                        "name": "content",
+                        "description": "Raw paste content (UTF-8)",
+                        "required": True,
+                        "schema": {
+                            "type": "string"
+                        }
+                    }
+                ],
+                "responses": {
+                    "201": {
+                        "description": "Paste created successfully",
+                        "schema": {
+                            "$ref": "#/definitions/PastebinOutput"
+                        }
+                    },
+                    "400": {
+                        "description": "Content is not valid UTF-8"
+                    },
+                    "413": {
+                        "description": "Paste exceeds the maximum size"
+                    },
+                    "415": {
+                        "description": "Content-Type is not a text type"
+                    },
+                    "500": {
+                        "description": "Server error"
+                    }
+                },
+                "tags": ["Pastebin"]
             }
         },
         "/pastebin/{paste_id}": {
@@ -267,12 +651,24 @@ swagger_config = {
             ],
             "get": {
                 "summary": "Get paste by ID",
-                "description": "Retrieves a paste by its ID",
+                "description": "Retrieves a paste by its ID. Responses carry a strong ETag (SHA-256 of the content) and a Cache-Control max-age equal to the paste's remaining lifetime",
                 "produces": ["text/plain"],
+                "parameters": [
+                    {
+                        "in": "header",
+                        "name": "If-None-Match",
+                        "type": "string",
+                        "required": False,
+                        "description": "ETag of a previously fetched response; 304 is returned if it matches"
+                    }
+                ],
                 "responses": {
                     "200": {
                         "description": "Paste content"
                     },
+                    "304": {
+                        "description": "Paste not modified"
+                    },
                     "404": {
                         "description": "Paste not found or expired"
                     },
@@ -283,6 +679,25 @@ swagger_config = {
                 "tags": ["Pastebin"]
             }
         },
+        "/pastebin/stats": {
+            "get": {
+                "summary": "Get paste storage statistics",
+                "description": "Returns paste and blob counts and the space saved by content deduplication and compression",
+                "produces": ["application/json"],
+                "responses": {
+                    "200": {
+                        "description": "Paste storage statistics",
+                        "schema": {
+                            "$ref": "#/definitions/PastebinStats"
+                        }
+                    },
+                    "500": {
+                        "description": "Server error"
+                    }
+                },
+                "tags": ["Pastebin"]
+            }
+        },
         "/pastebin/cleanup": {
             "post": {
                 "summary": "Clean up expired pastes",
@@ -320,6 +735,10 @@ swagger_config = {
                     "type": "number",
                     "format": "float",
                     "description": "Price of the item"
+                },
+                "version": {
+                    "type": "integer",
+                    "description": "Incremented by every update; send it in If-Match for optimistic locking"
                 }
             }
         },
@@ -360,6 +779,72 @@ swagger_config = {
                 }
             }
         },
+        "InventoryAdjustment": {
+            "type": "object",
+            "required": ["quantity_delta"],
+            "properties": {
+                "quantity_delta": {
+                    "type": "integer",
+                    "description": "Amount added to the quantity (negative to remove stock)"
+                },
+                "min_quantity": {
+                    "type": "integer",
+                    "description": "Reject the adjustment if the quantity would fall below this"
+                },
+                "max_quantity": {
+                    "type": "integer",
+                    "description": "Reject the adjustment if the quantity would rise above this"
+                }
+            }
+        },
+        "BatchOperation": {
+            "type": "object",
+            "required": ["op"],
+            "properties": {
+                "op": {
+                    "type": "string",
+                    "description": "Operation to apply",
+                    "enum": ["create", "update", "delete"]
+                },
+                "id": {
+                    "type": "integer",
+                    "description": "ID of the item (required for update and delete)"
+                },
+                "name": {
+                    "type": "string",
+                    "description": "Name of the item"
+                },
+                "quantity": {
+                    "type": "integer",
+                    "description": "Quantity of the item in stock"
+                },
+                "price": {
+                    "type": "number",
+                    "format": "float",
+                    "description": "Price of the item"
+                }
+            }
+        },
+        "BatchOutput": {
+            "type": "object",
+            "properties": {
+                "applied": {
+                    "type": "integer",
+                    "description": "Number of operations applied"
+                },
+                "failed": {
+                    "type": "integer",
+                    "description": "Number of operations rejected"
+                },
+                "results": {
+                    "type": "array",
+                    "description": "Result per operation: index, op, status, id and error (if any)",
+                    "items": {
+                        "type": "object"
+                    }
+                }
+            }
+        },
         "LogInput": {
             "type": "object",
             "required": ["level", "message"],
@@ -375,6 +860,22 @@ swagger_config = {
                 }
             }
         },
+        "PastebinStats": {
+            "type": "object",
+            "properties": {
+                "pastes": {"type": "integer", "description": "Number of stored pastes"},
+                "blob_references": {"type": "integer", "description": "Number of pastes pointing at a deduplicated blob"},
+                "unique_blobs": {"type": "integer", "description": "Number of distinct paste bodies"},
+                "logical_bytes": {"type": "integer", "description": "Uncompressed size of all blob-backed pastes"},
+                "unique_bytes": {"type": "integer", "description": "Uncompressed size of the distinct paste bodies"},
+                "stored_bytes": {"type": "integer", "description": "Size of the distinct paste bodies as stored"},
+                "dedup_ratio": {"type": "number", "description": "logical_bytes / unique_bytes"},
+                "compression_ratio": {"type": "number", "description": "unique_bytes / stored_bytes"},
+                "total_ratio": {"type": "number", "description": "logical_bytes / stored_bytes"},
+                "cache": {"type": "object", "description": "Paste cache hit, miss, store, eviction, expiration and invalidation counters, summed over all workers, and the number of entries as estimated by the serving worker"},
+                "sweeper": {"type": "object", "description": "Background sweep interval and the result of the last sweep (deleted, duration_ms, finished_at, pid), or null before the first sweep"}
+            }
+        },
         "PastebinInput": {
             "type": "object",
             "required": ["text"],
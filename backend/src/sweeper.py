@@ -0,0 +1,140 @@
+"""
+This module contains the background sweeper that removes expired pastes.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from database import db, Pastebin
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where every process sweeps
+    fcntl = None
+
+
+def delete_expired_pastes(batch_size, now=None, on_delete=None):
+    """
+    Deletes expired pastes in batches of at most batch_size rows, committing after each batch
+    so that writers in other workers are never blocked for long. Paste content is never loaded.
+    on_delete, if given, is called with the IDs deleted by each committed batch.
+    Returns a tuple of (deleted_count, duration_in_seconds).
+    """
+    if batch_size < 1:
+        # A batch would never delete anything, and the loop below would never end
+        raise ValueError("batch_size must be at least 1")
+    now = now or datetime.utcnow()
+    started = time.perf_counter()
+    # SQLite only supports DELETE ... LIMIT when compiled with SQLITE_ENABLE_UPDATE_DELETE_LIMIT,
+    # so each batch is picked by a LIMIT subquery on the expires_at index instead.
+    expired_batch = select(Pastebin.id).where(Pastebin.expires_at < now).limit(batch_size).scalar_subquery()
+    statement = (
+        delete(Pastebin)
+        .where(Pastebin.id.in_(expired_batch))
+        .returning(Pastebin.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    deleted = 0
+    while True:
+        deleted_ids = db.session.scalars(statement).all()
+        db.session.commit()
+        deleted += len(deleted_ids)
+        if on_delete and deleted_ids:
+            on_delete(deleted_ids)
+        if len(deleted_ids) < batch_size:
+            break
+    return deleted, time.perf_counter() - started
+
+
+class PasteSweeper:
+    """
+    Periodically deletes expired pastes from a background thread.
+    Every gunicorn worker starts a sweeper, but only the worker holding an exclusive lock on
+    lock_path sweeps. The lock is released when that worker exits, and another worker takes
+    over at its next interval. The result of the last sweep is written next to the lock file
+    (<lock_path without extension>.json), so every worker can report it; see status().
+    """
+
+    def __init__(self, app, interval, batch_size, lock_path, on_delete=None):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock_path = lock_path
+        self.on_delete = on_delete
+        self.state_path = os.path.splitext(lock_path)[0] + '.json'
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the sweeper thread if it is not already running in this process."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='paste-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _is_leader(self):
+        """Tries to take the sweeper lock without blocking. Returns True if this process holds it."""
+        if fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        self.app.logger.info("Process %s elected to run the paste sweeper.", os.getpid())
+        return True
+
+    def sweep(self):
+        """Runs a single sweep and records its result."""
+        with self.app.app_context():
+            try:
+                deleted, duration = delete_expired_pastes(self.batch_size, on_delete=self.on_delete)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error("Error sweeping expired pastes: %s", e)
+                return
+        self._write_state({
+            "deleted": deleted,
+            "duration_ms": round(duration * 1000, 2),
+            "finished_at": datetime.utcnow().isoformat() + "Z",
+            "pid": os.getpid()
+        })
+        self.app.logger.info("Paste sweep deleted %s expired pastes in %.1f ms", deleted, duration * 1000)
+
+    def status(self):
+        """Returns the sweep interval and the result of the last sweep by any worker (None before the first)."""
+        try:
+            with open(self.state_path) as f:
+                last_sweep = json.load(f)
+        except (OSError, ValueError):
+            last_sweep = None
+        return {"interval_seconds": self.interval, "last_sweep": last_sweep}
+
+    def _write_state(self, state):
+        # Write to a temporary file first so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # An error must not end the thread, or expired pastes would never be swept again
+            try:
+                if self._is_leader():
+                    self.sweep()
+            except Exception as e:
+                self.app.logger.error("Error in the paste sweeper: %s", e)